@@ -0,0 +1,77 @@
+"""Measures how much memory a parsed ledger takes up per entry.
+
+Parses a synthetic ledger with each parser and reports the memory still
+allocated afterwards, along with the size of its cache file. Run with
+`python -m benchmarks.bench_memory --entries 1000000`.
+"""
+
+import argparse
+import gc
+import os
+import tempfile
+import time
+import tracemalloc
+import typing
+
+from timcol import logfile
+from timcol.logfile import cache, mapped
+
+from .generate import LedgerSpec, generate_ledger
+
+
+def _parse_file(log_path: str) -> logfile.LogFile:
+    with open(log_path, encoding="utf8") as file:
+        return logfile.parse_file(file)
+
+
+def _parse_mapped(log_path: str) -> logfile.LogFile:
+    with open(log_path, "rb") as file:
+        return mapped.parse_mapped(file)
+
+
+def _retained(parse: typing.Callable[[], logfile.LogFile]) -> typing.Tuple[int, int]:
+    """Returns the bytes still allocated by `parse` once it returns, and how
+    many entries it parsed."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        log = parse()
+        gc.collect()
+        retained, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return retained, len(log.entries)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--entries", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        log_path = os.path.join(work_dir, "ledger.dat")
+        with open(log_path, "w", encoding="utf8") as file:
+            generate_ledger(file, LedgerSpec(entries=args.entries))
+
+        # Builds the cache so the last run loads it
+        cache.parse_path(log_path)
+        for name, parse in [
+            ("parse_file", lambda: _parse_file(log_path)),
+            ("parse_mapped", lambda: _parse_mapped(log_path)),
+            ("parse_path_warm", lambda: cache.parse_path(log_path)),
+        ]:
+            started = time.perf_counter()
+            retained, entries = _retained(parse)
+            seconds = time.perf_counter() - started
+            print(
+                f"{name:>16}: {retained / (1 << 20):8.1f} MB, "
+                f"{retained / max(entries, 1):6.0f} bytes/entry ({seconds:.1f}s)"
+            )
+
+        cache_size = os.path.getsize(cache.cache_path(log_path))
+        print(f"{'cache file':>16}: {cache_size / (1 << 20):8.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""Compares `directive.parse_timestamp` against plain strptime.
+
+Run with `python benchmarks/bench_timestamp.py`.
+"""
+
+import datetime
+import timeit
+
+from timcol.logfile import directive
+
+SAMPLES = [
+    "2023/07/30 10:00:00 AM",
+    "2023/07/30 12:00:00 AM",
+    "2023/07/30 12:30:15 PM",
+    "2024/02/29 11:59:59 PM",
+]
+NUMBER = 50_000
+
+
+def _strptime() -> None:
+    for i in SAMPLES:
+        datetime.datetime.strptime(i, directive.TIME_FORMAT)
+
+
+def _parse_timestamp() -> None:
+    for i in SAMPLES:
+        directive.parse_timestamp(i)
+
+
+def main() -> None:
+    results = {}
+    for name, fn in (("strptime", _strptime), ("parse_timestamp", _parse_timestamp)):
+        seconds = min(timeit.repeat(fn, number=NUMBER, repeat=5))
+        results[name] = seconds / (NUMBER * len(SAMPLES))
+        print(f"{name:>16}: {results[name] * 1e6:.2f} us/timestamp")
+
+    print(f"{'speedup':>16}: {results['strptime'] / results['parse_timestamp']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""Measures directive tokenizer throughput in lines/sec.
+
+Compares `directive.parse_line` against trying each directive pattern in turn
+and falling back to an uncompiled metadata match for every other line. Run
+with `python benchmarks/bench_tokenizer.py`.
+"""
+
+import re
+import timeit
+
+from timcol.logfile import directive
+
+LINES = [
+    "i 2023/07/30 10:00:00 AM ClientA  Writing email\n",
+    "    ; Multiplier: 2\n",
+    "o 2023/07/30 11:00:00 AM\n",
+    "\n",
+    "; A comment\n",
+    "i 2023/07/30 12:00:00 PM ClientB  Implementing milestone 1\n",
+    "o 2023/07/30 01:00:00 PM\n",
+    "\n",
+] * 1000
+
+
+def _try_each(line: str) -> object:
+    for t in (directive.CheckIn, directive.CheckOut):
+        maybe_parsed = t.parse(line)
+        if maybe_parsed:
+            return maybe_parsed
+
+    return re.match(r"^ {4}; ([^:]+):(.+?)$", line)
+
+
+def _try_each_all() -> None:
+    for i in LINES:
+        _try_each(i)
+
+
+def _parse_line_all() -> None:
+    for i in LINES:
+        directive.parse_line(i)
+
+
+def main() -> None:
+    for name, fn in (("try each", _try_each_all), ("parse_line", _parse_line_all)):
+        seconds = min(timeit.repeat(fn, number=5, repeat=5)) / 5
+        print(f"{name:>12}: {len(LINES) / seconds:,.0f} lines/sec")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Generates deterministic synthetic ledgers for benchmarking.
+
+Run with `python -m benchmarks.generate --entries 100000 ledger.dat`.
+"""
+
+import argparse
+import datetime
+import random
+import typing
+
+from timcol.logfile import directive
+
+START = datetime.datetime(2020, 1, 1, 9, 0, 0)
+
+TASK_WORDS = [
+    "Writing",
+    "Reviewing",
+    "Implementing",
+    "Debugging",
+    "Planning",
+    "email",
+    "milestone",
+    "invoice",
+    "tests",
+    "deploy",
+]
+
+
+class LedgerSpec(typing.NamedTuple):
+    entries: int = 1000
+    accounts: int = 5
+    # Fraction of entries that carry metadata lines
+    metadata_density: float = 0.1
+    days: int = 365
+    seed: int = 0
+
+
+def generate_ledger(file: typing.TextIO, spec: LedgerSpec) -> None:
+    """Writes a well-formed ledger of `spec.entries` completed entries to `file`.
+
+    Entries are spread evenly over `spec.days` days in chronological order, so
+    the same spec always produces the same bytes.
+    """
+    rng = random.Random(spec.seed)
+    accounts = [f"Client{i}" for i in range(spec.accounts)]
+    gap = datetime.timedelta(days=spec.days) / max(spec.entries, 1)
+
+    lines: list[str] = []
+    for i in range(spec.entries):
+        check_in = START + gap * i
+        duration = max(gap * rng.uniform(0.2, 0.9), datetime.timedelta(seconds=1))
+        check_out = check_in + duration
+
+        task = " ".join(rng.choices(TASK_WORDS, k=3))
+        lines.append(
+            f"i {check_in.strftime(directive.TIME_FORMAT)} "
+            f"{rng.choice(accounts)}  {task} #{i}\n"
+        )
+        if rng.random() < spec.metadata_density:
+            lines.append(f"    ; Multiplier: {rng.choice(['0.5', '1.5', '2'])}\n")
+            if rng.random() < 0.5:
+                lines.append(f"    ; Rate: {rng.choice(['100', '150'])}\n")
+        lines.append(f"o {check_out.strftime(directive.TIME_FORMAT)}\n")
+
+        if len(lines) >= 10_000:
+            file.writelines(lines)
+            lines = []
+
+    file.writelines(lines)
+
+
+def main() -> None:
+    defaults = LedgerSpec()
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("output", help="Path to write the ledger to.")
+    parser.add_argument("--entries", type=int, default=defaults.entries)
+    parser.add_argument("--accounts", type=int, default=defaults.accounts)
+    parser.add_argument(
+        "--metadata-density", type=float, default=defaults.metadata_density
+    )
+    parser.add_argument("--days", type=int, default=defaults.days)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    args = parser.parse_args()
+
+    with open(args.output, "w", encoding="utf8") as file:
+        generate_ledger(
+            file,
+            LedgerSpec(
+                args.entries,
+                args.accounts,
+                args.metadata_density,
+                args.days,
+                args.seed,
+            ),
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""Times parsing, views, mutators and CLI start up on synthetic ledgers.
+
+Run with `python -m benchmarks.run --output results.json`. Compare two runs by
+diffing their JSON files.
+"""
+
+import argparse
+import contextlib
+import datetime
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import typing
+
+from timcol import logfile
+from timcol.logfile import cache, chunked, mapped
+from timcol.tool import mutators
+from timcol.tool.args import ParsedArgs
+from timcol.tool.views import csv, html, register, summary
+
+from .generate import LedgerSpec, generate_ledger
+
+DEFAULT_SIZES = [1_000, 100_000, 1_000_000]
+
+
+class Result(typing.NamedTuple):
+    entries: int
+    benchmark: str
+    seconds: float
+
+
+def _best_of(repeat: int, fn: typing.Callable[[], object]) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+
+    return best
+
+
+def _quietly(fn: typing.Callable[[], object]) -> typing.Callable[[], None]:
+    def run() -> None:
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            fn()
+
+    return run
+
+
+def _parse(log_path: str) -> logfile.LogFile:
+    with open(log_path, encoding="utf8") as file:
+        return logfile.parse_file(file)
+
+
+def _parse_mapped(log_path: str) -> logfile.LogFile:
+    with open(log_path, "rb") as file:
+        return mapped.parse_mapped(file)
+
+
+def _run_cli(log_path: str, *args: str) -> None:
+    subprocess.run(
+        [sys.executable, "-m", "timcol", "-f", log_path, *args],
+        check=True,
+        stdout=subprocess.DEVNULL,
+    )
+
+
+def bench_size(work_dir: str, spec: LedgerSpec, repeat: int) -> typing.Iterator[Result]:
+    log_path = os.path.join(work_dir, f"ledger-{spec.entries}.dat")
+    with open(log_path, "w", encoding="utf8") as file:
+        generate_ledger(file, spec)
+
+    def result(name: str, fn: typing.Callable[[], object], times: int = repeat):
+        seconds = _best_of(times, fn)
+        print(f"{spec.entries:>10,} {name:<20} {seconds:10.4f}s", file=sys.stderr)
+        return Result(spec.entries, name, seconds)
+
+    yield result("parse_file", lambda: _parse(log_path))
+    yield result("parse_mapped", lambda: _parse_mapped(log_path))
+    yield result(
+        "parse_parallel",
+        lambda: chunked.parse_parallel(log_path, 0, os.path.getsize(log_path)),
+    )
+
+    cache_path = cache.cache_path(log_path)
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(cache_path)
+    yield result("parse_path_cold", lambda: cache.parse_path(log_path), times=1)
+    yield result("parse_path_warm", lambda: cache.parse_path(log_path))
+
+    logs = _parse(log_path)
+    yield result(
+        "view_register",
+        _quietly(
+            lambda: register.render(
+                logs, ParsedArgs.RegisterArgs(False, False, None, None)
+            )
+        ),
+    )
+    yield result(
+        "view_summary",
+        _quietly(lambda: summary.render(logs, ParsedArgs.SummaryArgs("month", False))),
+    )
+    yield result(
+        "view_csv",
+        _quietly(lambda: csv.render(logs, ParsedArgs.CsvArgs(100.0, True, False))),
+    )
+    yield result(
+        "view_html",
+        _quietly(lambda: html.render(logs, ParsedArgs.HtmlArgs(100.0, True))),
+    )
+
+    # Each mutator leaves the ledger in the state the next one expects
+    mutator_path = os.path.join(work_dir, "mutators.dat")
+    shutil.copyfile(log_path, mutator_path)
+    start_args = ParsedArgs.StartArgs("Client0", "Benchmarking")
+    backfill_args = ParsedArgs.BackfillArgs(
+        "Client0",
+        "Benchmarking",
+        datetime.datetime.now(),
+        datetime.timedelta(minutes=5),
+    )
+    for name, fn in [
+        ("mutator_start", lambda: mutators.start(mutator_path, start_args)),
+        ("mutator_cancel", lambda: mutators.cancel(mutator_path)),
+        ("mutator_resume", lambda: mutators.resume(mutator_path)),
+        ("mutator_stop", lambda: mutators.stop(mutator_path)),
+        ("mutator_backfill", lambda: mutators.backfill(mutator_path, backfill_args)),
+    ]:
+        yield result(name, _quietly(fn), times=1)
+
+    yield result("cli_log_path", lambda: _run_cli(log_path, "log-path"))
+    yield result("cli_stop", lambda: _run_cli(mutator_path, "stop"))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=DEFAULT_SIZES,
+        help="Number of entries in each generated ledger.",
+    )
+    parser.add_argument("--days", type=int, default=3650)
+    parser.add_argument("--accounts", type=int, default=LedgerSpec().accounts)
+    parser.add_argument(
+        "--metadata-density", type=float, default=LedgerSpec().metadata_density
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", default="bench_results.json")
+    args = parser.parse_args()
+
+    results: list[Result] = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        for size in args.sizes:
+            spec = LedgerSpec(size, args.accounts, args.metadata_density, args.days)
+            results.extend(bench_size(work_dir, spec, args.repeat))
+
+    with open(args.output, "w", encoding="utf8") as file:
+        json.dump(
+            {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "timestamp": datetime.datetime.now().isoformat(),
+                "results": [i._asdict() for i in results],
+            },
+            file,
+            indent=2,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,53 +1,56 @@
 import typing
-import re
 
 from . import directive
 from . import entry
+from . import phases
 from .logfile import LogFile
 
 
-def _parse_directive(
-    raw_directive: str,
-) -> directive.CheckIn | directive.CheckOut | None:
-    for t in (directive.CheckIn, directive.CheckOut):
-        maybe_parsed = t.parse(raw_directive)
-        if maybe_parsed:
-            return maybe_parsed
-
-    return None
-
-
+@phases.timed_iter("parse directives")
 def _parse_all_directives(
     file: typing.TextIO,
+    check_in_filter: directive.CheckInFilter | None = None,
 ) -> typing.Iterable[directive.CheckIn | directive.CheckOut]:
     current_directive = None
+    skipping = False
     for i in file:
-        maybe_directive = _parse_directive(i)
-        if maybe_directive:
+        # Everything up to the next check in belongs to a skipped check in
+        if skipping and i[:1] != "i":
+            continue
+
+        token = directive.parse_line(i, check_in_filter)
+        if token is None:
+            continue
+
+        if isinstance(token, directive.Skipped):
             if current_directive:
                 yield current_directive
-            current_directive = maybe_directive
+            current_directive = None
+            skipping = True
             continue
+        skipping = False
 
-        maybe_metadata = re.match(r"^ {4}; ([^:]+):(.+?)$", i)
-        if maybe_metadata:
+        if isinstance(token, directive.Metadata):
             assert (
                 current_directive is not None
-            ), f"Found metadata outside of directive: {maybe_metadata.group(0)}"
-            current_directive.metadata[maybe_metadata.group(1).strip()] = (
-                maybe_metadata.group(2).strip()
-            )
+            ), f"Found metadata outside of directive: {i.rstrip()}"
+            current_directive.add_metadata(token.key, token.value)
             continue
 
+        if current_directive:
+            yield current_directive
+        current_directive = token
+
     if current_directive:
         yield current_directive
 
 
-def parse_file(file: typing.TextIO) -> LogFile:
-    entries: typing.List[entry.Entry] = []
-
+@phases.timed_iter("pair entries", count=True)
+def _pair_directives(
+    directives: typing.Iterable[directive.CheckIn | directive.CheckOut],
+) -> typing.Iterator[entry.Entry | directive.CheckIn]:
     current_directive: directive.CheckIn | None = None
-    for i in _parse_all_directives(file):
+    for i in directives:
         if current_directive is None:
             assert isinstance(
                 i, directive.CheckIn
@@ -57,7 +60,42 @@ def parse_file(file: typing.TextIO) -> LogFile:
             assert isinstance(
                 i, directive.CheckOut
             ), f"Expected CheckOut directive, found {i}"
-            entries.append(entry.Entry(current_directive, i))
+            yield entry.Entry(current_directive, i)
             current_directive = None
 
-    return LogFile(entries, current_directive)
+    if current_directive is not None:
+        yield current_directive
+
+
+@phases.timed("pair entries")
+def _collect_entries(
+    entries: typing.Iterable[entry.Entry | directive.CheckIn],
+) -> LogFile:
+    completed: typing.List[entry.Entry] = []
+
+    pending: directive.CheckIn | None = None
+    for i in entries:
+        if isinstance(i, entry.Entry):
+            completed.append(i)
+        else:
+            pending = i
+
+    return LogFile(completed, pending)
+
+
+def iter_entries(
+    file: typing.TextIO,
+    check_in_filter: directive.CheckInFilter | None = None,
+) -> typing.Iterator[entry.Entry | directive.CheckIn]:
+    """Yields each entry in `file` as soon as it's complete.
+
+    If the last task is still pending its check in is yielded last. Entries
+    rejected by `check_in_filter` are skipped without being fully parsed.
+    """
+    return _pair_directives(_parse_all_directives(file, check_in_filter))
+
+
+def parse_file(
+    file: typing.TextIO, check_in_filter: directive.CheckInFilter | None = None
+) -> LogFile:
+    return _collect_entries(iter_entries(file, check_in_filter))
@@ -0,0 +1,135 @@
+import hashlib
+import os
+import typing
+
+from . import chunked, entry, phases, pickled, tail
+from .logfile import LogFile
+
+CACHE_VERSION = 4
+CHUNK_SIZE = 1 << 20
+
+
+class _Cache(typing.NamedTuple):
+    version: int
+    size: int
+    mtime_ns: int
+    # Entries are only cached up to the check in of the last completed entry,
+    # since it may still have metadata appended to it. A pending task is never
+    # cached since `cancel` may truncate it.
+    offset: int
+    prefix_digest: bytes
+    rows: list[entry.Row]
+
+
+def cache_path(log_path: str) -> str:
+    return f"{log_path}.cache"
+
+
+def is_current(log_path: str) -> bool:
+    """Returns whether the cache was written since `log_path` last changed.
+
+    Only compares modification times so it's much cheaper than loading the
+    cache, but `parse_path` still validates it before it's used.
+    """
+    try:
+        return (
+            os.stat(cache_path(log_path)).st_mtime_ns >= os.stat(log_path).st_mtime_ns
+        )
+    except FileNotFoundError:
+        return False
+
+
+def _load(log_path: str) -> _Cache | None:
+    cache = pickled.load(cache_path(log_path), _Cache)
+    if cache is None or cache.version != CACHE_VERSION:
+        return None
+
+    return cache
+
+
+def _store(log_path: str, cache: _Cache) -> None:
+    pickled.store(cache_path(log_path), cache)
+
+
+def hash_range(
+    file: typing.BinaryIO, digest: "hashlib._Hash", start: int, end: int
+) -> "hashlib._Hash":
+    """Feeds the bytes of `file` from `start` up to `end` into `digest`."""
+    file.seek(start)
+    length = end - start
+    while length > 0:
+        chunk = file.read(min(CHUNK_SIZE, length))
+        if not chunk:
+            break
+        digest.update(chunk)
+        length -= len(chunk)
+
+    return digest
+
+
+@phases.timed("read")
+def parse_path(log_path: str) -> LogFile:
+    """Parses the ledger at `log_path`, reusing entries cached beside it.
+
+    Because the mutators only ever append to the ledger, the cache is usually
+    valid for a prefix of the file and only the bytes after it are parsed. If
+    that prefix changed (ex: after `timcol edit`) the whole file is parsed.
+    """
+    with open(log_path, "rb") as file:
+        stat = os.fstat(file.fileno())
+        cache = _load(log_path)
+        unchanged = cache is not None and (cache.size, cache.mtime_ns) == (
+            stat.st_size,
+            stat.st_mtime_ns,
+        )
+
+        digest = hashlib.sha1(usedforsecurity=False)
+        if cache is not None and not unchanged:
+            if cache.offset >= stat.st_size:
+                cache = None
+            else:
+                hash_range(file, digest, 0, cache.offset)
+                if digest.digest() != cache.prefix_digest:
+                    cache = None
+                    digest = hashlib.sha1(usedforsecurity=False)
+
+        offset = cache.offset if cache is not None else 0
+        try:
+            new_log = chunked.parse_from(file, offset)
+        except Exception:
+            if cache is None:
+                raise
+
+            # The rest of the ledger doesn't follow on from the cached prefix
+            cache = None
+            unchanged = False
+            offset = 0
+            digest = hashlib.sha1(usedforsecurity=False)
+            new_log = chunked.parse_from(file, offset)
+
+        entries = new_log.entries
+        if cache is not None:
+            phases.count_entries(len(cache.rows))
+            entries = [*map(entry.from_row, cache.rows), *entries]
+
+        if not unchanged:
+            cached_entries = entries
+            last_entry = tail.find_last_entry_offset(file)
+            if last_entry is not None and last_entry >= offset:
+                cached_entries = entries[:-1]
+                hash_range(file, digest, offset, last_entry)
+                offset = last_entry
+
+            _store(
+                log_path,
+                _Cache(
+                    CACHE_VERSION,
+                    stat.st_size,
+                    stat.st_mtime_ns,
+                    offset,
+                    digest.digest(),
+                    [entry.to_row(i) for i in cached_entries],
+                ),
+            )
+
+    return LogFile(entries, new_log.pending)
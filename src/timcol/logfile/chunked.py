@@ -0,0 +1,123 @@
+import concurrent.futures
+import contextlib
+import gc
+import mmap
+import os
+import typing
+
+from . import directive, entry, mapped
+from .logfile import LogFile
+
+# Below this many bytes, starting worker processes costs more than they save.
+# Shared by everything that parses ledgers in a process pool.
+PARALLEL_THRESHOLD = 4 << 20
+
+# A few chunks per worker evens out how long each one takes
+CHUNKS_PER_WORKER = 4
+
+_Chunk = typing.Tuple[list[entry.Row], directive.CheckIn | None]
+
+
+def _next_check_in(buffer: bytes | mmap.mmap, position: int, end: int) -> int:
+    """Returns the offset of the first check in at or after `position`."""
+    # Start at the newline before `position` in case a check in starts there
+    position = buffer.find(b"\ni ", max(position - 1, 0), end)
+    while position != -1:
+        if mapped.is_check_in(buffer, position + 1):
+            return position + 1
+        position = buffer.find(b"\ni ", position + 1, end)
+
+    return end
+
+
+def find_boundaries(
+    buffer: bytes | mmap.mmap, start: int, end: int, count: int
+) -> list[int]:
+    """Splits `start` to `end` into at most `count` chunks that each start at a
+    check in, returning their offsets followed by `end`."""
+    boundaries = [start]
+    for i in range(1, count):
+        boundary = _next_check_in(buffer, start + (end - start) * i // count, end)
+        if boundary > boundaries[-1] and boundary < end:
+            boundaries.append(boundary)
+
+    boundaries.append(end)
+    return boundaries
+
+
+@contextlib.contextmanager
+def _gc_paused() -> typing.Iterator[None]:
+    # The cyclic GC otherwise keeps rescanning millions of new directives
+    was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if was_enabled:
+            gc.enable()
+
+
+def _parse_chunk(log_path: str, start: int, end: int) -> _Chunk:
+    with open(log_path, "rb") as file, _gc_paused():
+        file.seek(start)
+        log = mapped.parse_buffer(file.read(end - start))
+
+    return [entry.to_row(i) for i in log.entries], log.pending
+
+
+def _stitch(chunks: typing.Iterable[_Chunk]) -> LogFile:
+    entries: list[entry.Entry] = []
+    pending: directive.CheckIn | None = None
+    for rows, chunk_pending in chunks:
+        if pending is not None:
+            # Only the last chunk may end on a check in without a check out
+            found = entry.from_row(rows[0]).check_in if rows else chunk_pending
+            raise AssertionError(f"Expected CheckOut directive, found {found}")
+
+        entries.extend(map(entry.from_row, rows))
+        pending = chunk_pending
+
+    return LogFile(entries, pending)
+
+
+def parse_parallel(
+    log_path: str, start: int, end: int, workers: int | None = None
+) -> LogFile:
+    """Parses `log_path` from `start` up to `end` in a process pool."""
+    if end <= start:
+        return LogFile([], None)
+
+    workers = workers or os.cpu_count() or 1
+    with open(log_path, "rb") as file:
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            boundaries = find_boundaries(
+                buffer, start, end, workers * CHUNKS_PER_WORKER
+            )
+
+    with concurrent.futures.ProcessPoolExecutor(workers) as executor, _gc_paused():
+        return _stitch(
+            executor.map(
+                _parse_chunk,
+                [log_path] * (len(boundaries) - 1),
+                boundaries[:-1],
+                boundaries[1:],
+            )
+        )
+
+
+def parse_from(file: typing.BinaryIO, start: int = 0) -> LogFile:
+    """Parses `file` from `start` onwards, in parallel if enough is left."""
+    workers = os.cpu_count() or 1
+    size = os.fstat(file.fileno()).st_size
+    if workers < 2 or size - start < PARALLEL_THRESHOLD:
+        return mapped.parse_from(file, start)
+
+    # Only imported when needed since it's slow to import
+    import multiprocessing
+
+    # Workers don't start pools of their own (ex: while caching shards)
+    if not isinstance(file.name, str) or multiprocessing.parent_process() is not None:
+        return mapped.parse_from(file, start)
+
+    # Anything appended since `file` was opened is left for next time
+    return parse_parallel(file.name, start, size, workers)
@@ -0,0 +1,174 @@
+import array
+import datetime
+import math
+import typing
+
+from . import directive
+from .logfile import LogFile
+
+try:
+    import numpy
+except ImportError:
+    # Everything works without NumPy, just several times slower
+    numpy = None
+
+# Timestamps are stored as seconds since this. Like the ledger's own
+# timestamps it's naive, so each day is exactly 86400 seconds long.
+EPOCH = datetime.datetime(1970, 1, 1)
+SECONDS_PER_DAY = 24 * 60 * 60
+
+# An `array.array` or, when NumPy is installed, a `numpy.ndarray`
+Column = typing.Any
+
+
+class Columns(typing.NamedTuple):
+    """A ledger's entries as parallel arrays, one item per entry.
+
+    A pending task is included as though it were checked out at the time the
+    columns were built.
+    """
+
+    # Seconds since `EPOCH`
+    start: array.array
+    stop: array.array
+    multiplier: array.array
+    # Indexes into `accounts`
+    account: array.array
+    accounts: list[str]
+
+
+class Group(typing.NamedTuple):
+    key: int
+    entries: int
+    total: float
+
+
+class _Interner:
+    """Assigns each distinct string a small integer id."""
+
+    def __init__(self) -> None:
+        self.ids: dict[str, int] = {}
+        self.labels: list[str] = []
+
+    def __call__(self, label: str) -> int:
+        i = self.ids.get(label)
+        if i is None:
+            i = self.ids[label] = len(self.labels)
+            self.labels.append(label)
+
+        return i
+
+
+def _pending_stop(
+    pending: directive.CheckIn, now: datetime.datetime
+) -> datetime.datetime:
+    # Rounded down to the second like every other timestamp in the ledger
+    elapsed = math.floor((now - pending.timestamp).total_seconds())
+    return pending.timestamp + datetime.timedelta(seconds=elapsed)
+
+
+def _seconds(timestamps: typing.Iterable[datetime.datetime]) -> array.array:
+    return array.array("d", [(i - EPOCH).total_seconds() for i in timestamps])
+
+
+def from_log(log: LogFile, now: datetime.datetime) -> Columns:
+    check_ins = [i.check_in for i in log.entries]
+    check_outs = [i.check_out.timestamp for i in log.entries]
+    metadata = [i.metadata for i in log.entries]
+    if log.pending is not None:
+        check_ins.append(log.pending)
+        check_outs.append(_pending_stop(log.pending, now))
+        metadata.append(log.pending.metadata)
+
+    interner = _Interner()
+    return Columns(
+        start=_seconds([i.timestamp for i in check_ins]),
+        stop=_seconds(check_outs),
+        multiplier=array.array(
+            "d", [float(i.get("Multiplier", 1.0)) for i in metadata]
+        ),
+        account=array.array("q", [interner(i.account) for i in check_ins]),
+        accounts=interner.labels,
+    )
+
+
+def metadata_column(log: LogFile, key: str) -> typing.Tuple[array.array, list[str]]:
+    """Returns the ids of each entry's `key` metadata along with their labels.
+
+    Entries without it get the id of the empty string.
+    """
+    interner = _Interner()
+    ids = array.array("q", [interner(i.metadata.get(key, "")) for i in log.entries])
+    if log.pending is not None:
+        ids.append(interner(log.pending.metadata.get(key, "")))
+
+    return ids, interner.labels
+
+
+def subtract(a: Column, b: Column) -> Column:
+    if numpy is not None:
+        return numpy.asarray(a) - numpy.asarray(b)
+
+    return array.array("d", [x - y for x, y in zip(a, b)])
+
+
+def days(seconds: Column) -> Column:
+    """Returns the number of whole days since `EPOCH` for each item."""
+    if numpy is not None:
+        return (numpy.asarray(seconds) // SECONDS_PER_DAY).astype(numpy.int64)
+
+    return array.array("q", [int(i // SECONDS_PER_DAY) for i in seconds])
+
+
+def map_pairs(
+    fn: typing.Callable[[float, float], float], a: Column, b: Column
+) -> Column:
+    """Returns `fn(x, y)` for each pair of items, calling it only once for each
+    distinct pair."""
+    if numpy is not None:
+        a = numpy.asarray(a, dtype=float)
+        b = numpy.asarray(b, dtype=float)
+        result = numpy.empty_like(a)
+        # `b` is expected to have few distinct values (ex: multipliers)
+        for y in numpy.unique(b).tolist():
+            mask = b == y
+            unique, inverse = numpy.unique(a[mask], return_inverse=True)
+            mapped = numpy.array([fn(x, y) for x in unique.tolist()], dtype=float)
+            result[mask] = mapped[inverse.reshape(-1)]
+
+        return result
+
+    memo: dict[typing.Tuple[float, float], float] = {}
+    result = array.array("d")
+    for pair in zip(a, b):
+        value = memo.get(pair)
+        if value is None:
+            value = memo[pair] = fn(*pair)
+        result.append(value)
+
+    return result
+
+
+def group_sum(keys: Column, values: Column) -> list[Group]:
+    """Adds up `values` by their `keys`, returning one group per key in order."""
+    if numpy is not None:
+        unique, inverse = numpy.unique(numpy.asarray(keys), return_inverse=True)
+        inverse = inverse.reshape(-1)
+        counts = numpy.bincount(inverse, minlength=len(unique))
+        totals = numpy.bincount(
+            inverse, weights=numpy.asarray(values, dtype=float), minlength=len(unique)
+        )
+        return [
+            Group(*i) for i in zip(unique.tolist(), counts.tolist(), totals.tolist())
+        ]
+
+    groups: dict[int, typing.List[float]] = {}
+    for key, value in zip(keys, values):
+        group = groups.get(key)
+        if group is None:
+            groups[key] = [1, value]
+        else:
+            group[0] += 1
+            group[1] += value
+
+    return [Group(k, int(v[0]), v[1]) for k, v in sorted(groups.items())]
@@ -1,37 +1,161 @@
 import datetime
 import re
+import sys
 
-from typing import Self
+from typing import Any, Iterator, Mapping, NamedTuple, Self, overload
 
 TIME_FORMAT = "%Y/%m/%d %I:%M:%S %p"
 
+METADATA_RE = re.compile(r"^ {4}; ([^:]+):(.+?)$")
+
+
+class _EmptyMetadata(Mapping[str, str]):
+    __slots__ = ()
+
+    def __getitem__(self, key: str) -> str:
+        raise KeyError(key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return default
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(())
+
+    def __len__(self) -> int:
+        return 0
+
+    def __reduce__(self) -> str:
+        # Unpickles as the shared instance
+        return "EMPTY_METADATA"
+
+
+# Shared by every directive without metadata so each doesn't need its own dict
+EMPTY_METADATA: Mapping[str, str] = _EmptyMetadata()
+
+# Metadata values up to this long are interned, longer ones are most likely
+# free-form notes that are rarely repeated.
+INTERN_MAX_LENGTH = 32
+
+# At most this many distinct metadata mappings are shared between directives
+SHARED_METADATA_LIMIT = 4096
+
+# The mapping each directive gets by adding a key and value to a shared one,
+# keyed by the id of that mapping. Shared mappings are never freed, so their
+# ids are never reused.
+_shared_metadata: dict[tuple[int, str, str], Mapping[str, str]] = {}
+_shared_ids = {id(EMPTY_METADATA)}
+
+
+def _add_metadata(
+    metadata: Mapping[str, str], key: str, value: str
+) -> Mapping[str, str]:
+    """Returns `metadata` with `key` set to `value`.
+
+    The same few keys and values (ex: `Multiplier: 2`) show up on thousands of
+    directives, so they're interned, and identical mappings built up from them
+    are shared rather than copied. Nothing modifies a directive's metadata in
+    place, it's only ever replaced.
+    """
+    key = sys.intern(key)
+    if len(value) > INTERN_MAX_LENGTH or id(metadata) not in _shared_ids:
+        return {**metadata, key: value}
+
+    value = sys.intern(value)
+    memo_key = (id(metadata), key, value)
+    extended = _shared_metadata.get(memo_key)
+    if extended is None:
+        extended = {**metadata, key: value}
+        if len(_shared_metadata) < SHARED_METADATA_LIMIT:
+            _shared_metadata[memo_key] = extended
+            _shared_ids.add(id(extended))
+
+    return extended
+
+
+# Matches exactly what TIME_FORMAT produces, which is what the mutators write
+_FIXED_TIMESTAMP_RE = re.compile(r"\d{4}/\d\d/\d\d \d\d:\d\d:\d\d [AP]M", re.ASCII)
+
+
+def parse_timestamp(text: str) -> datetime.datetime:
+    """Parses `text` according to TIME_FORMAT.
+
+    Equivalent to `datetime.datetime.strptime(text, TIME_FORMAT)` but slices the
+    fields out directly when `text` is zero-padded, which is several times
+    faster. Anything irregular is left to strptime.
+    """
+    if _FIXED_TIMESTAMP_RE.fullmatch(text):
+        hour = int(text[11:13])
+        if 1 <= hour <= 12:
+            if text[20] == "P":
+                hour = hour % 12 + 12
+            else:
+                hour = hour % 12
+
+            try:
+                return datetime.datetime(
+                    int(text[0:4]),
+                    int(text[5:7]),
+                    int(text[8:10]),
+                    hour,
+                    int(text[14:16]),
+                    int(text[17:19]),
+                )
+            except ValueError:
+                # Let strptime raise its own error for impossible dates
+                pass
+
+    return datetime.datetime.strptime(text, TIME_FORMAT)
+
 
 class CheckIn:
     RE = re.compile(r"^i ([^ ]+ [^ ]+ (?:AM|PM)) (.+?) {2}(.+?)$", re.MULTILINE)
 
+    __slots__ = ("timestamp", "account", "task", "metadata")
+
     def __init__(
         self, *, timestamp: datetime.datetime, account: str, task: str
     ) -> None:
         self.timestamp = timestamp
-        self.account = account
+        # Ledgers only have a handful of accounts, tasks are usually unique
+        self.account = sys.intern(account)
         self.task = task
-        self.metadata: dict[str, str] = {}
+        self.metadata: Mapping[str, str] = EMPTY_METADATA
 
     def __eq__(self, other: object) -> bool:
         if not isinstance(other, CheckIn):
             return False
-        return self.__dict__ == other.__dict__
+        return (self.timestamp, self.account, self.task, self.metadata) == (
+            other.timestamp,
+            other.account,
+            other.task,
+            other.metadata,
+        )
+
+    def add_metadata(self, key: str, value: str) -> None:
+        self.metadata = _add_metadata(self.metadata, key, value)
 
     @classmethod
-    def parse(cls, directive: str) -> Self | None:
+    def parse(
+        cls, directive: str, check_in_filter: "CheckInFilter | None" = None
+    ) -> "Self | Skipped | None":
+        """Parses `directive` if it's a check in.
+
+        If `check_in_filter` rejects it then `SKIPPED` is returned before its
+        timestamp is parsed.
+        """
         checkin_match = cls.RE.match(directive)
         if checkin_match:
+            account = checkin_match.group(2)
+            task = checkin_match.group(3)
+            if check_in_filter is not None and not check_in_filter.matches(
+                account, task
+            ):
+                return SKIPPED
+
             return cls(
-                timestamp=datetime.datetime.strptime(
-                    checkin_match.group(1), TIME_FORMAT
-                ),
-                account=checkin_match.group(2),
-                task=checkin_match.group(3),
+                timestamp=parse_timestamp(checkin_match.group(1)),
+                account=account,
+                task=task,
             )
 
         return None
@@ -40,23 +164,79 @@ class CheckIn:
 class CheckOut:
     RE = re.compile(r"^o ([^ ]+ [^ ]+ (?:AM|PM))$", re.MULTILINE)
 
+    __slots__ = ("timestamp", "metadata")
+
     def __init__(self, *, timestamp: datetime.datetime) -> None:
         self.timestamp = timestamp
-        self.metadata: dict[str, str] = {}
+        self.metadata: Mapping[str, str] = EMPTY_METADATA
 
     def __eq__(self, other: object) -> bool:
         if not isinstance(other, CheckOut):
             return False
-        return self.__dict__ == other.__dict__
+        return (self.timestamp, self.metadata) == (other.timestamp, other.metadata)
+
+    def add_metadata(self, key: str, value: str) -> None:
+        self.metadata = _add_metadata(self.metadata, key, value)
 
     @classmethod
     def parse(cls, directive: str) -> Self | None:
         checkout_match = cls.RE.match(directive)
         if checkout_match:
-            return cls(
-                timestamp=datetime.datetime.strptime(
-                    checkout_match.group(1), TIME_FORMAT
-                )
-            )
+            return cls(timestamp=parse_timestamp(checkout_match.group(1)))
 
         return None
+
+
+class Metadata(NamedTuple):
+    key: str
+    value: str
+
+
+class CheckInFilter(NamedTuple):
+    # Only keep check ins for exactly this account
+    account: str | None = None
+    # Only keep check ins whose task contains this
+    task: str | None = None
+
+    def matches(self, account: str, task: str) -> bool:
+        return (self.account is None or account == self.account) and (
+            self.task is None or self.task in task
+        )
+
+
+class Skipped:
+    """A check in that was rejected by a `CheckInFilter`."""
+
+    __slots__ = ()
+
+
+SKIPPED = Skipped()
+
+
+@overload
+def parse_line(line: str) -> CheckIn | CheckOut | Metadata | None: ...
+@overload
+def parse_line(
+    line: str, check_in_filter: CheckInFilter | None
+) -> CheckIn | CheckOut | Metadata | Skipped | None: ...
+def parse_line(
+    line: str, check_in_filter: CheckInFilter | None = None
+) -> CheckIn | CheckOut | Metadata | Skipped | None:
+    """Parses a single line of a ledger.
+
+    Dispatches on the first character so each line is matched against at most
+    one pattern, and blank lines and comments aren't matched against any.
+    """
+    match line[:1]:
+        case "i":
+            return CheckIn.parse(line, check_in_filter)
+        case "o":
+            return CheckOut.parse(line)
+        case " ":
+            metadata_match = METADATA_RE.match(line)
+            if metadata_match:
+                return Metadata(
+                    metadata_match.group(1).strip(), metadata_match.group(2).strip()
+                )
+
+    return None
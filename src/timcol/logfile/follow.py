@@ -0,0 +1,139 @@
+import hashlib
+import os
+import typing
+
+from . import cache, entry, mapped, shards, tail
+from .logfile import LogFile
+
+
+class Follower:
+    """Keeps the ledger at `log_path` parsed, parsing only what's appended.
+
+    Like `tail -f`, the ledger is only parsed from the start again when it
+    shrinks, is replaced, or anything before the parsed tail is edited (ex:
+    after `timcol edit`).
+    """
+
+    def __init__(self, log_path: str) -> None:
+        self.log_path = log_path
+        self._reset()
+
+    def _reset(self) -> None:
+        self._stat: typing.Tuple[int, int, int] | None = None
+        # Entries are only kept up to the check in of the last completed
+        # entry, same as the cache (see `cache._Cache.offset`).
+        self._offset = 0
+        self._entries: list[entry.Entry] = []
+        # The bytes before `_offset`, to notice when they've been edited
+        self._prefix_digest = b""
+        self.log = LogFile([], None)
+
+    def _is_appended(
+        self, file: typing.BinaryIO, stat: os.stat_result, digest: "hashlib._Hash"
+    ) -> bool:
+        """Returns whether the ledger was only appended to since the last
+        refresh, feeding the bytes before `_offset` into `digest`."""
+        assert self._stat is not None
+        inode, size, _ = self._stat
+        if stat.st_ino != inode or stat.st_size < size:
+            return False
+
+        cache.hash_range(file, digest, 0, self._offset)
+        return digest.digest() == self._prefix_digest
+
+    def refresh(self) -> LogFile:
+        """Returns the ledger as it is now, parsing anything appended to it.
+
+        Only stats the ledger if nothing's changed since the last refresh.
+        """
+        try:
+            stat = os.stat(self.log_path)
+        except FileNotFoundError:
+            self._reset()
+            raise
+
+        key = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+        if key == self._stat:
+            return self.log
+
+        with open(self.log_path, "rb") as file:
+            digest = hashlib.sha1(usedforsecurity=False)
+            if self._stat is None or not self._is_appended(file, stat, digest):
+                self._reset()
+                digest = hashlib.sha1(usedforsecurity=False)
+
+            try:
+                new_log = mapped.parse_from(file, self._offset)
+            except Exception:
+                if not self._offset:
+                    raise
+
+                # The rest of the ledger doesn't follow on from the kept entries
+                self._reset()
+                digest = hashlib.sha1(usedforsecurity=False)
+                new_log = mapped.parse_from(file, self._offset)
+
+            entries = [*self._entries, *new_log.entries]
+
+            last_entry = tail.find_last_entry_offset(file)
+            if last_entry is not None and last_entry >= self._offset:
+                self._entries = entries[:-1]
+                cache.hash_range(file, digest, self._offset, last_entry)
+                self._offset = last_entry
+                self._prefix_digest = digest.digest()
+
+        self._stat = key
+        self.log = LogFile(entries, new_log.pending)
+        return self.log
+
+
+class LedgerFollower:
+    """Keeps every shard of the ledger at `log_path` parsed with `Follower`s."""
+
+    def __init__(self, log_path: str) -> None:
+        self.log_path = log_path
+        self._index_stat: typing.Tuple[int, int, int] | None = None
+        self._paths: list[str] = []
+        self._followers: dict[str, Follower] = {}
+        self._logs: list[LogFile] = []
+        # Shared by every missing shard so they don't count as changes
+        self._missing = LogFile([], None)
+        self.log = LogFile([], None)
+
+    def _find_shards(self) -> list[str]:
+        # Includes may be globs that list whole directories, so only follow
+        # them again on changes
+        try:
+            stat = os.stat(self.log_path)
+            key = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+        except FileNotFoundError:
+            key = None
+
+        if key is None or key != self._index_stat:
+            self._paths = shards.find_shards(self.log_path)
+            self._index_stat = key
+
+        return self._paths
+
+    def refresh(self) -> LogFile:
+        """Returns the ledger as it is now, see `Follower.refresh`.
+
+        Returns the same `LogFile` as last time if no shard has changed.
+        """
+        paths = self._find_shards()
+        self._followers = {i: self._followers.get(i) or Follower(i) for i in paths}
+
+        logs: list[LogFile] = []
+        for path in paths:
+            try:
+                logs.append(self._followers[path].refresh())
+            except FileNotFoundError:
+                logs.append(self._missing)
+
+        if len(logs) != len(self._logs) or any(
+            i is not j for i, j in zip(logs, self._logs)
+        ):
+            self._logs = logs
+            self.log = shards.merge(paths, logs)
+
+        return self.log
@@ -0,0 +1,96 @@
+import io
+import mmap
+import os
+import re
+import typing
+
+from . import _collect_entries, _pair_directives, directive, parse_file, phases
+from .logfile import LogFile
+
+# Ledgers with at least this many unparsed bytes are parsed through mmap
+MMAP_THRESHOLD = 4 << 20
+
+# Matches the same lines as the patterns in `directive`, but against the raw
+# bytes of the whole ledger. Lines that aren't directives or metadata are
+# skipped by the regex engine without ever being decoded.
+_LINE_RE = re.compile(
+    rb"^(?:"
+    rb"i ([^ \n]+ [^ \n]+ (?:AM|PM)) (.+?) {2}(.+?)"
+    rb"|o ([^ \n]+ [^ \n]+ (?:AM|PM))"
+    rb"| {4}; ([^:\n]+):(.+?)"
+    rb")\r?$",
+    re.MULTILINE,
+)
+
+
+@phases.timed_iter("parse directives")
+def _parse_all_directives(
+    buffer: bytes | mmap.mmap, start: int
+) -> typing.Iterator[directive.CheckIn | directive.CheckOut]:
+    current_directive: directive.CheckIn | directive.CheckOut | None = None
+    for i in _LINE_RE.finditer(buffer, start):
+        # Each alternative in _LINE_RE ends with a different group
+        match i.lastindex:
+            case 3:
+                if current_directive:
+                    yield current_directive
+                timestamp, account, task = i.group(1, 2, 3)
+                current_directive = directive.CheckIn(
+                    timestamp=directive.parse_timestamp(timestamp.decode()),
+                    account=account.decode(),
+                    task=task.decode(),
+                )
+            case 4:
+                if current_directive:
+                    yield current_directive
+                current_directive = directive.CheckOut(
+                    timestamp=directive.parse_timestamp(i.group(4).decode())
+                )
+            case _:
+                assert (
+                    current_directive is not None
+                ), f"Found metadata outside of directive: {i.group(0).decode()}"
+                key, value = i.group(5, 6)
+                current_directive.add_metadata(
+                    key.decode().strip(), value.decode().strip()
+                )
+
+    if current_directive:
+        yield current_directive
+
+
+def parse_buffer(buffer: bytes | mmap.mmap, start: int = 0) -> LogFile:
+    """Parses the ledger in `buffer` from the byte offset `start` onwards.
+
+    Produces the same `LogFile` as `parse_file`, but matches directly against
+    the raw bytes and only decodes the fields it keeps.
+    """
+    return _collect_entries(_pair_directives(_parse_all_directives(buffer, start)))
+
+
+def is_check_in(buffer: bytes | mmap.mmap, position: int) -> bool:
+    """Returns whether a check in directive starts at `position`."""
+    line = _LINE_RE.match(buffer, position)
+    return line is not None and line.lastindex == 3
+
+
+def parse_mapped(file: typing.BinaryIO, start: int = 0) -> LogFile:
+    """Memory maps `file` and parses it from the byte offset `start` onwards."""
+    if os.fstat(file.fileno()).st_size == 0:
+        # Empty files can't be mapped
+        return LogFile([], None)
+
+    with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+        return parse_buffer(buffer, start)
+
+
+def parse_from(file: typing.BinaryIO, start: int = 0) -> LogFile:
+    """Parses `file` from the byte offset `start` onwards.
+
+    Only memory maps `file` when enough of it is left to be worth it.
+    """
+    if os.fstat(file.fileno()).st_size - start >= MMAP_THRESHOLD:
+        return parse_mapped(file, start)
+
+    file.seek(start)
+    return parse_file(io.TextIOWrapper(io.BytesIO(file.read()), encoding="utf8"))
@@ -0,0 +1,90 @@
+import functools
+import typing
+
+P = typing.ParamSpec("P")
+T = typing.TypeVar("T")
+
+
+class Recorder(typing.Protocol):
+    entries: int
+
+    def enter(self, name: str) -> None: ...
+
+    def exit(self) -> None: ...
+
+
+# Records the phases of the command being profiled, see `tool.profiling`
+recorder: Recorder | None = None
+
+
+def count_entries(count: int) -> None:
+    """Counts entries that were produced without being paired (ex: cached)."""
+    if recorder is not None:
+        recorder.entries += count
+
+
+def timed(
+    name: str,
+) -> typing.Callable[[typing.Callable[P, T]], typing.Callable[P, T]]:
+    """Counts the time spent in the decorated function towards `name`."""
+
+    def decorator(fn: typing.Callable[P, T]) -> typing.Callable[P, T]:
+        @functools.wraps(fn)
+        def wrapper(*args: P.args, **kwargs: P.kwargs) -> T:
+            active = recorder
+            if active is None:
+                return fn(*args, **kwargs)
+
+            active.enter(name)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                active.exit()
+
+        return wrapper
+
+    return decorator
+
+
+def timed_iter(
+    name: str, count: bool = False
+) -> typing.Callable[
+    [typing.Callable[P, typing.Iterable[T]]], typing.Callable[P, typing.Iterator[T]]
+]:
+    """Counts the time the decorated generator spends producing each item
+    towards `name`, and optionally counts the items as entries."""
+
+    def decorator(
+        fn: typing.Callable[P, typing.Iterable[T]],
+    ) -> typing.Callable[P, typing.Iterator[T]]:
+        @functools.wraps(fn)
+        def wrapper(*args: P.args, **kwargs: P.kwargs) -> typing.Iterator[T]:
+            active = recorder
+            if active is None:
+                return iter(fn(*args, **kwargs))
+
+            return _timed_items(active, name, count, fn(*args, **kwargs))
+
+        return wrapper
+
+    return decorator
+
+
+def _timed_items(
+    active: Recorder, name: str, count: bool, items: typing.Iterable[T]
+) -> typing.Iterator[T]:
+    active.enter(name)
+    timing = True
+    try:
+        for item in items:
+            if count:
+                active.entries += 1
+            active.exit()
+            timing = False
+            yield item
+            active.enter(name)
+            timing = True
+    finally:
+        # Ex: the caller stopped iterating early
+        if timing:
+            active.exit()
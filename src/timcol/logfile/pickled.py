@@ -0,0 +1,32 @@
+import os
+import pickle
+import typing
+
+_T = typing.TypeVar("_T")
+
+
+def load(path: str, kind: typing.Type[_T]) -> _T | None:
+    """Returns the `kind` pickled at `path`, or None if there isn't one.
+
+    Everything stored this way can be recomputed, so a missing, corrupt, or
+    outdated file is treated as absent rather than reported.
+    """
+    try:
+        with open(path, "rb") as file:
+            value = pickle.load(file)
+    except Exception:
+        return None
+
+    return value if isinstance(value, kind) else None
+
+
+def store(path: str, value: object) -> None:
+    """Pickles `value` to `path`, replacing it atomically so concurrent readers
+    never see a partial file. Failures (ex: a read-only directory) are ignored.
+    """
+    try:
+        with open(f"{path}.tmp", "wb") as file:
+            pickle.dump(value, file, pickle.HIGHEST_PROTOCOL)
+        os.replace(f"{path}.tmp", path)
+    except OSError:
+        pass
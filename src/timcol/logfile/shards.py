@@ -0,0 +1,157 @@
+import concurrent.futures
+import glob
+import heapq
+import os
+import re
+import typing
+
+from . import cache, chunked, directive, tail
+from .logfile import LogFile
+
+# Files kept beside a ledger that globs of shards mustn't pick up: caches and
+# their temporary files, the daemon's socket, and the upload stamp.
+SIDECAR_SUFFIXES = (".cache", ".tmp", ".sock", ".stamp")
+
+# Ledger-CLI's `include` directive, which may name a glob of files
+INCLUDE_RE = re.compile(rb"include[ \t]+(.+?)[ \t]*\r?$")
+
+
+class ShardError(ValueError):
+    """The ledger's shards can't be used as they are (ex: a task is pending in
+    an older shard)."""
+
+
+def _read_include_patterns(file: typing.BinaryIO) -> list[str]:
+    # Includes are only honored in the header before the first directive, so
+    # finding them doesn't read a whole ledger that has none
+    patterns = []
+    for line in file:
+        include_match = INCLUDE_RE.match(line)
+        if include_match:
+            patterns.append(include_match.group(1).decode("utf8"))
+        elif line[:1] in (b"i", b"o", b" ", b"\t"):
+            break
+
+    return patterns
+
+
+def _glob(pattern: str) -> list[str]:
+    return sorted(i for i in glob.glob(pattern) if not i.endswith(SIDECAR_SUFFIXES))
+
+
+def _read_includes(log_path: str) -> list[str]:
+    try:
+        with open(log_path, "rb") as file:
+            patterns = _read_include_patterns(file)
+    except FileNotFoundError:
+        return []
+
+    base = os.path.dirname(log_path)
+    paths: list[str] = []
+    for pattern in patterns:
+        pattern = os.path.join(base, os.path.expanduser(pattern))
+        paths.extend(_glob(pattern) if glob.has_magic(pattern) else [pattern])
+
+    return paths
+
+
+def find_shards(log_path: str) -> list[str]:
+    """Returns every ledger that makes up `log_path`, oldest first.
+
+    `log_path` may be a glob of shards (ex: `ledger-*.dat`), which are ordered
+    by name. Otherwise the ledger is followed by anything it `include`s before
+    its first directive, in the order they're included. Includes aren't
+    followed inside shards.
+    """
+    if glob.has_magic(log_path):
+        return _glob(log_path)
+
+    return [log_path, *_read_includes(log_path)]
+
+
+def _check_old_shards(
+    paths: list[str], pending: typing.Iterable[directive.CheckIn | None]
+) -> None:
+    for path, check_in in zip(paths[:-1], pending):
+        if check_in is not None:
+            raise ShardError(
+                f"Found pending task in {path}, only {paths[-1]} may have one"
+            )
+
+
+def _find_pending(path: str) -> directive.CheckIn | None:
+    try:
+        with open(path, "rb") as file:
+            return tail.find_pending(file)
+    except FileNotFoundError:
+        return None
+
+
+def write_path(log_path: str) -> str:
+    """Returns the shard of `log_path` new directives should be written to.
+
+    That's always the newest shard, so a task left pending in an older one is
+    an error. A glob of shards must match at least one ledger.
+    """
+    paths = find_shards(log_path)
+    if not paths:
+        raise ShardError(f"No ledger matches {log_path}")
+
+    _check_old_shards(paths, map(_find_pending, paths[:-1]))
+    return paths[-1]
+
+
+def _build_cache(log_path: str) -> None:
+    # Only the cache is kept, entries are slow to send back between processes
+    cache.parse_path(log_path)
+
+
+def _build_stale_caches(paths: list[str]) -> None:
+    stale = [i for i in paths if os.path.exists(i) and not cache.is_current(i)]
+    workers = min(len(stale), os.cpu_count() or 1)
+    if workers < 2 or sum(map(os.path.getsize, stale)) < chunked.PARALLEL_THRESHOLD:
+        return
+
+    with concurrent.futures.ProcessPoolExecutor(workers) as executor:
+        for _ in executor.map(_build_cache, stale):
+            pass
+
+
+def parse_shards(
+    paths: list[str], parse: typing.Callable[[str], LogFile] | None = None
+) -> LogFile:
+    """Parses each shard with `parse` and merges them chronologically.
+
+    By default shards are parsed through their caches, and any caches that are
+    out of date are first rebuilt concurrently in a process pool. Shards that
+    don't exist yet are treated as empty.
+    """
+    if parse is None:
+        _build_stale_caches(paths)
+        parse = cache.parse_path
+
+    logs: list[LogFile] = []
+    for path in paths:
+        try:
+            logs.append(parse(path))
+        except FileNotFoundError:
+            # Ex: next year's shard is included before anything is written to it
+            logs.append(LogFile([], None))
+
+    return merge(paths, logs)
+
+
+def merge(paths: list[str], logs: list[LogFile]) -> LogFile:
+    """Merges the parsed shards at `paths` chronologically."""
+    if not logs:
+        return LogFile([], None)
+    if len(logs) == 1:
+        return logs[0]
+
+    _check_old_shards(paths, (i.pending for i in logs[:-1]))
+    return LogFile(
+        list(
+            heapq.merge(*(i.entries for i in logs), key=lambda i: i.check_in.timestamp)
+        ),
+        logs[-1].pending,
+    )
@@ -0,0 +1,183 @@
+import datetime
+import os
+import typing
+
+from . import directive, timerange
+from .entry import Entry
+from .logfile import LogFile
+
+BLOCK_SIZE = 8192
+
+
+def _reversed_lines(
+    file: typing.BinaryIO, block_size: int = BLOCK_SIZE
+) -> typing.Iterator[typing.Tuple[int, str]]:
+    """Yields the lines of `file` from last to first without trailing newlines.
+
+    Each line is paired with the byte offset it starts at. Only as many blocks
+    as are needed to produce the requested lines are read.
+    """
+    position = file.seek(0, os.SEEK_END)
+    remainder = b""
+    while position > 0:
+        read_size = min(block_size, position)
+        position -= read_size
+        file.seek(position)
+        chunk = file.read(read_size) + remainder
+        lines = chunk.split(b"\n")
+
+        # The first line in the block may continue into the previous block
+        remainder = lines.pop(0)
+        line_end = position + len(chunk)
+        for line in reversed(lines):
+            line_start = line_end - len(line)
+            yield line_start, line.rstrip(b"\r").decode("utf8")
+            line_end = line_start - 1
+
+    yield 0, remainder.rstrip(b"\r").decode("utf8")
+
+
+def find_last_line(
+    file: typing.BinaryIO, block_size: int = BLOCK_SIZE
+) -> typing.Tuple[int, str] | None:
+    """Returns the last non-blank line in `file` and the offset it starts at.
+
+    The line is stripped of surrounding whitespace.
+    """
+    for offset, line in _reversed_lines(file, block_size):
+        if line.strip():
+            return offset, line.strip()
+
+    return None
+
+
+def _reversed_directives(
+    file: typing.BinaryIO, block_size: int = BLOCK_SIZE
+) -> typing.Iterator[typing.Tuple[int, directive.CheckIn | directive.CheckOut]]:
+    metadata: typing.List[directive.Metadata] = []
+    for offset, line in _reversed_lines(file, block_size):
+        token = directive.parse_line(line)
+        if token is None:
+            continue
+
+        if isinstance(token, directive.Metadata):
+            metadata.append(token)
+            continue
+
+        for key, value in reversed(metadata):
+            token.add_metadata(key, value)
+        metadata = []
+        yield offset, token
+
+    assert not metadata, f"Found metadata outside of directive: {metadata[-1]}"
+
+
+def reversed_directives(
+    file: typing.BinaryIO, block_size: int = BLOCK_SIZE
+) -> typing.Iterator[directive.CheckIn | directive.CheckOut]:
+    """Yields the directives in `file` from last to first, with metadata."""
+    for _, i in _reversed_directives(file, block_size):
+        yield i
+
+
+def find_last_entry_offset(
+    file: typing.BinaryIO, block_size: int = BLOCK_SIZE
+) -> int | None:
+    """Returns the byte offset of the check in of the last completed entry in
+    `file`, skipping over a pending one."""
+    checked_out = False
+    for offset, i in _reversed_directives(file, block_size):
+        if isinstance(i, directive.CheckOut):
+            checked_out = True
+        elif checked_out:
+            return offset
+
+    return None
+
+
+def find_pending(
+    file: typing.BinaryIO, block_size: int = BLOCK_SIZE
+) -> directive.CheckIn | None:
+    """Returns the pending check in, reading only the tail of `file`."""
+    last = next(reversed_directives(file, block_size), None)
+    if isinstance(last, directive.CheckIn):
+        return last
+
+    return None
+
+
+def reversed_entries(
+    file: typing.BinaryIO, block_size: int = BLOCK_SIZE
+) -> typing.Iterator[Entry | directive.CheckIn]:
+    """Yields the pending check in, if any, then the entries in `file` from
+    last to first."""
+    directives = reversed_directives(file, block_size)
+
+    check_out = next(directives, None)
+    if isinstance(check_out, directive.CheckIn):
+        yield check_out
+        check_out = next(directives, None)
+
+    while check_out is not None:
+        check_in = next(directives, None)
+        assert isinstance(
+            check_out, directive.CheckOut
+        ), f"Expected CheckOut directive, found {check_out}"
+        assert isinstance(
+            check_in, directive.CheckIn
+        ), f"Expected CheckIn directive, found {check_in}"
+        yield Entry(check_in, check_out)
+        check_out = next(directives, None)
+
+
+def find_last_entry(
+    file: typing.BinaryIO, block_size: int = BLOCK_SIZE
+) -> Entry | None:
+    """Returns the last completed entry, reading only the tail of `file`."""
+    for i in reversed_entries(file, block_size):
+        if isinstance(i, Entry):
+            return i
+
+    return None
+
+
+def take_window(
+    items: typing.Iterable[Entry | directive.CheckIn],
+    last: int | None = None,
+    since: datetime.datetime | None = None,
+) -> LogFile:
+    """Collects the end of a ledger from `items`, which are its pending check in
+    and entries from last to first (ex: from `reversed_entries`).
+
+    Takes the last `last` items, plus any before them that started on the same
+    day so that the earliest day's subtotal is complete, and only the items
+    started at or after `since`. Stops reading `items` once both are satisfied.
+    """
+    window: typing.List[Entry | directive.CheckIn] = []
+    for i in items:
+        check_in = i if isinstance(i, directive.CheckIn) else i.check_in
+        if (
+            last is not None
+            and len(window) >= last
+            and (not window or check_in.timestamp.date() != _started_on(window[-1]))
+        ):
+            break
+
+        if since is not None and check_in.timestamp < since:
+            # Entries added by `timcol backfill` may be out of order
+            if check_in.timestamp < since - timerange.BACKFILL_SLACK:
+                break
+            continue
+
+        window.append(i)
+
+    pending = window[0] if window else None
+    if not isinstance(pending, directive.CheckIn):
+        pending = None
+
+    return LogFile([i for i in reversed(window) if isinstance(i, Entry)], pending)
+
+
+def _started_on(i: Entry | directive.CheckIn) -> datetime.date:
+    check_in = i if isinstance(i, directive.CheckIn) else i.check_in
+    return check_in.timestamp.date()
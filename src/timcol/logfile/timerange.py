@@ -0,0 +1,95 @@
+import datetime
+import io
+import os
+import typing
+
+from . import _collect_entries, directive, iter_entries
+from .entry import Entry
+from .logfile import LogFile
+
+# Ledgers are chronological except for entries added by `timcol backfill`,
+# which are appended after entries that started later than them. Searching
+# this much further out keeps backfills made within a week of the task.
+BACKFILL_SLACK = datetime.timedelta(days=7)
+
+
+def _next_check_in(
+    file: typing.BinaryIO, position: int
+) -> typing.Tuple[int, datetime.datetime] | None:
+    """Finds the first check in line that starts at or after `position`."""
+    if position > 0:
+        # Skip the rest of the line that `position` is in the middle of
+        file.seek(position - 1)
+        file.readline()
+    else:
+        file.seek(0)
+
+    while True:
+        offset = file.tell()
+        line = file.readline()
+        if not line:
+            return None
+
+        token = directive.parse_line(line.decode("utf8"))
+        if isinstance(token, directive.CheckIn):
+            return offset, token.timestamp
+
+
+def find_check_in_offset(file: typing.BinaryIO, when: datetime.datetime) -> int:
+    """Returns the offset of the first check in at or after `when`.
+
+    Binary searches over the byte offsets in `file`, reading only a few lines
+    at each step. Returns the size of `file` if every check in is earlier.
+    """
+    low = 0
+    high = file.seek(0, os.SEEK_END)
+    while low < high:
+        middle = (low + high) // 2
+        found = _next_check_in(file, middle)
+        if found is None or found[1] >= when:
+            high = middle
+        else:
+            low = middle + 1
+
+    found = _next_check_in(file, low)
+    return found[0] if found else file.seek(0, os.SEEK_END)
+
+
+def iter_range(
+    file: typing.BinaryIO,
+    since: datetime.datetime | None,
+    until: datetime.datetime | None,
+    check_in_filter: directive.CheckInFilter | None = None,
+) -> typing.Iterator[Entry | directive.CheckIn]:
+    """Yields the entries in `file` that started in [since, until).
+
+    Starts reading near `since` and stops shortly after `until`, so only the
+    part of the ledger covering the range is parsed. Entries rejected by
+    `check_in_filter` are skipped as they're read.
+    """
+    file.seek(
+        0 if since is None else find_check_in_offset(file, since - BACKFILL_SLACK)
+    )
+    text = io.TextIOWrapper(file, encoding="utf8")
+    try:
+        for i in iter_entries(text, check_in_filter):
+            check_in = i.check_in if isinstance(i, Entry) else i
+            if until is not None and check_in.timestamp >= until + BACKFILL_SLACK:
+                break
+
+            if (since is None or check_in.timestamp >= since) and (
+                until is None or check_in.timestamp < until
+            ):
+                yield i
+    finally:
+        # Leave `file` open for the caller
+        text.detach()
+
+
+def parse_range(
+    file: typing.BinaryIO,
+    since: datetime.datetime | None,
+    until: datetime.datetime | None,
+    check_in_filter: directive.CheckInFilter | None = None,
+) -> LogFile:
+    return _collect_entries(iter_range(file, since, until, check_in_filter))
@@ -4,7 +4,8 @@ import os
 import datetime
 import re
 
-import dateparser
+from ..logfile import directive
+from ..logfile.logfile import LogFile
 
 
 def parse_duration(text: str) -> datetime.timedelta:
@@ -31,7 +32,31 @@ def parse_duration(text: str) -> datetime.timedelta:
     return duration
 
 
+def _positive_int(text: str) -> int:
+    value = int(text)
+    if value < 1:
+        raise ValueError()
+
+    return value
+
+
+def parse_rates(path: str) -> dict[str, float]:
+    """Reads hourly rates by account from the TOML file at `path`.
+
+    Ex: `Client1 = 150` or `"Client 2" = 95.5`, one per line.
+    """
+    import tomllib
+
+    with open(path, "rb") as file:
+        rates = tomllib.load(file)
+
+    return {account: float(rate) for account, rate in rates.items()}
+
+
 def parse_datetime(text: str) -> datetime.datetime:
+    # dateparser is slow to import so only pay for it when it's used
+    import dateparser
+
     result = dateparser.parse(text)
     if result is None:
         raise ValueError()
@@ -40,17 +65,79 @@ def parse_datetime(text: str) -> datetime.datetime:
 
 
 class ParsedArgs:
+    class FilterArgs(typing.NamedTuple):
+        since: datetime.datetime | None
+        until: datetime.datetime | None
+        account: str | None
+        task: str | None
+
+        def check_in_filter(self) -> directive.CheckInFilter | None:
+            if self.account is None and self.task is None:
+                return None
+
+            return directive.CheckInFilter(self.account, self.task)
+
+        def matches(self, check_in: directive.CheckIn) -> bool:
+            check_in_filter = self.check_in_filter()
+            return (
+                (self.since is None or check_in.timestamp >= self.since)
+                and (self.until is None or check_in.timestamp < self.until)
+                and (
+                    check_in_filter is None
+                    or check_in_filter.matches(check_in.account, check_in.task)
+                )
+            )
+
+        def apply(self, log: LogFile) -> LogFile:
+            """Filters an already parsed `log`."""
+            if not any(self):
+                return log
+
+            return LogFile(
+                [i for i in log.entries if self.matches(i.check_in)],
+                log.pending if log.pending and self.matches(log.pending) else None,
+            )
+
     class RegisterArgs(typing.NamedTuple):
         show_unscaled_time: bool
+        watch: bool
+        last: int | None
+        days: int | None
+
+        def window_start(self) -> datetime.datetime | None:
+            """Returns the start of the first day shown by `days`."""
+            if self.days is None:
+                return None
+
+            first_day = datetime.date.today() - datetime.timedelta(days=self.days - 1)
+            return datetime.datetime.combine(first_day, datetime.time())
+
+    class SummaryArgs(typing.NamedTuple):
+        by: str
+        show_unscaled_time: bool
 
     class CsvArgs(typing.NamedTuple):
         rate: float
         allow_rate_override: bool
+        stream: bool
 
     class HtmlArgs(typing.NamedTuple):
         rate: float
         allow_rate_override: bool
 
+    class JsonArgs(typing.NamedTuple):
+        array: bool
+
+    class InvoicesArgs(typing.NamedTuple):
+        rate: float
+        allow_rate_override: bool
+        # Hourly rates by account, overriding `rate`
+        rates: typing.Mapping[str, float]
+        period: str
+        formats: list[str]
+        output_dir: str
+        jobs: int | None
+
     class StartArgs(typing.NamedTuple):
         account: str
         description: str
@@ -61,6 +148,9 @@ class ParsedArgs:
         start: datetime.datetime
         duration: datetime.timedelta
 
+    class UploadArgs(typing.NamedTuple):
+        force: bool
+
     def __init__(self, args: argparse.Namespace):
         sub_command: str = {"register": "reg", "sync": "upload"}.get(
             args.sub_command, args.sub_command
@@ -80,25 +170,65 @@ class ParsedArgs:
             "stop",
             "sync",
             "backfill",
+            "daemon",
+            "summary",
+            "json",
+            "invoices",
         }
         self.sub_command = sub_command
 
         self.log_file: str | None = args.file
+        self.profile: bool = args.profile
+        self.profile_output: str | None = args.profile_output
+
+        self.filter_args: ParsedArgs.FilterArgs | None = None
+        if self.sub_command in ("reg", "summary", "csv", "html", "json", "invoices"):
+            self.filter_args = ParsedArgs.FilterArgs(
+                getattr(args, "since", None),
+                getattr(args, "until", None),
+                getattr(args, "account", None),
+                getattr(args, "task", None),
+            )
 
         self.register_args: ParsedArgs.RegisterArgs | None = None
         if self.sub_command == "reg":
             self.register_args = ParsedArgs.RegisterArgs(
-                getattr(args, "unscaled", False)
+                getattr(args, "unscaled", False),
+                getattr(args, "watch", False),
+                getattr(args, "last", None),
+                getattr(args, "days", None),
             )
 
+        self.summary_args: ParsedArgs.SummaryArgs | None = None
+        if self.sub_command == "summary":
+            self.summary_args = ParsedArgs.SummaryArgs(args.by, args.unscaled)
+
         self.csv_args: ParsedArgs.CsvArgs | None = None
         if self.sub_command == "csv":
-            self.csv_args = ParsedArgs.CsvArgs(args.rate, args.allow_rate_override)
+            self.csv_args = ParsedArgs.CsvArgs(
+                args.rate, args.allow_rate_override, args.stream
+            )
 
         self.html_args: ParsedArgs.HtmlArgs | None = None
         if self.sub_command == "html":
             self.html_args = ParsedArgs.HtmlArgs(args.rate, args.allow_rate_override)
 
+        self.json_args: ParsedArgs.JsonArgs | None = None
+        if self.sub_command == "json":
+            self.json_args = ParsedArgs.JsonArgs(args.array)
+
+        self.invoices_args: ParsedArgs.InvoicesArgs | None = None
+        if self.sub_command == "invoices":
+            self.invoices_args = ParsedArgs.InvoicesArgs(
+                args.rate,
+                args.allow_rate_override,
+                args.rates or {},
+                args.period,
+                args.format or ["html", "csv"],
+                args.output_dir,
+                args.jobs,
+            )
+
         self.start_args: ParsedArgs.StartArgs | None = None
         if self.sub_command in ("start", "swap"):
             self.start_args = ParsedArgs.StartArgs(args.account, args.description)
@@ -109,6 +239,31 @@ class ParsedArgs:
                 args.account, args.description, args.start, args.duration
             )
 
+        self.upload_args: ParsedArgs.UploadArgs | None = None
+        if self.sub_command == "upload":
+            self.upload_args = ParsedArgs.UploadArgs(args.force)
+
+
+def _add_filter_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--since",
+        type=parse_datetime,
+        help="Only include tasks started at or after this time.",
+    )
+    parser.add_argument(
+        "--until",
+        type=parse_datetime,
+        help="Only include tasks started before this time.",
+    )
+    parser.add_argument(
+        "--account",
+        help="Only include tasks for exactly this account.",
+    )
+    parser.add_argument(
+        "--task",
+        help="Only include tasks whose description contains this text.",
+    )
+
 
 def parse_args(raw_args: list[str]) -> ParsedArgs:
     parser = argparse.ArgumentParser(
@@ -126,6 +281,23 @@ def parse_args(raw_args: list[str]) -> ParsedArgs:
         ),
     )
 
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help=(
+            "Print how long each phase of the command took to stderr. Can also "
+            "be enabled by setting $TIMCOL_PROFILE to 1."
+        ),
+    )
+    parser.add_argument(
+        "--profile-output",
+        metavar="FILE",
+        help=(
+            "Also save cProfile stats to FILE (ex: for snakeviz). Can also be "
+            "set with $TIMCOL_PROFILE=FILE."
+        ),
+    )
+
     subparsers = parser.add_subparsers(title="SUB COMMANDS", dest="sub_command")
     subparsers.default = "register"
 
@@ -137,6 +309,48 @@ def parse_args(raw_args: list[str]) -> ParsedArgs:
     register_parser.add_argument(
         "-u", "--unscaled", action="store_true", help="Show unscaled totals."
     )
+    # Watching already shows as much of the end as fits in the terminal
+    window_group = register_parser.add_mutually_exclusive_group()
+    window_group.add_argument(
+        "-w",
+        "--watch",
+        action="store_true",
+        help="Keep the register up to date as the ledger changes, like `tail -f`.",
+    )
+    window_group.add_argument(
+        "-n",
+        "--last",
+        type=_positive_int,
+        metavar="N",
+        help=(
+            "Only show the last N tasks, with their days' subtotals. Reads just "
+            "the end of the ledger."
+        ),
+    )
+    window_group.add_argument(
+        "--days",
+        type=_positive_int,
+        metavar="N",
+        help="Only show tasks from the last N days, including today.",
+    )
+    _add_filter_arguments(register_parser)
+
+    summary_parser = subparsers.add_parser(
+        "summary", help="Total time by account, date, or metadata."
+    )
+    summary_parser.add_argument(
+        "-b",
+        "--by",
+        default="account",
+        help=(
+            "What to total time by: account, day, week, month, or a metadata "
+            "key such as Multiplier. Defaults to account."
+        ),
+    )
+    summary_parser.add_argument(
+        "-u", "--unscaled", action="store_true", help="Show unscaled totals."
+    )
+    _add_filter_arguments(summary_parser)
 
     csv_parser = subparsers.add_parser("csv", help="CSV-formatted invoice.")
     csv_parser.add_argument("rate", type=float, help="Hourly rate to bill in USD.")
@@ -145,6 +359,15 @@ def parse_args(raw_args: list[str]) -> ParsedArgs:
         action="store_true",
         help="Allows directives to override their rate.",
     )
+    csv_parser.add_argument(
+        "--stream",
+        action="store_true",
+        help=(
+            "Write rows while reading the ledger rather than parsing it first. "
+            "Uses constant memory for very large ledgers."
+        ),
+    )
+    _add_filter_arguments(csv_parser)
 
     csv_parser = subparsers.add_parser("html", help="HTML-formatted invoice.")
     csv_parser.add_argument("rate", type=float, help="Hourly rate to bill in USD.")
@@ -153,6 +376,73 @@ def parse_args(raw_args: list[str]) -> ParsedArgs:
         action="store_true",
         help="Allows directives to override their rate.",
     )
+    _add_filter_arguments(csv_parser)
+
+    json_parser = subparsers.add_parser(
+        "json",
+        help=(
+            "One JSON object per line for each task, written while reading the ledger."
+        ),
+    )
+    json_parser.add_argument(
+        "--array",
+        action="store_true",
+        help="Write a single JSON array of the tasks instead.",
+    )
+    _add_filter_arguments(json_parser)
+
+    invoices_parser = subparsers.add_parser(
+        "invoices",
+        help=(
+            "Write an HTML and CSV invoice for each account and month to a "
+            "directory, parsing the ledger only once."
+        ),
+    )
+    invoices_parser.add_argument(
+        "rate", type=float, help="Hourly rate to bill in USD, unless overridden."
+    )
+    invoices_parser.add_argument(
+        "--allow-rate-override",
+        action="store_true",
+        help="Allows directives to override their rate.",
+    )
+    invoices_parser.add_argument(
+        "--rates",
+        type=parse_rates,
+        metavar="FILE",
+        help=(
+            "TOML file of hourly rates by account (ex: `Client1 = 150`) for "
+            "accounts that aren't billed at RATE."
+        ),
+    )
+    invoices_parser.add_argument(
+        "--period",
+        choices=["day", "week", "month", "year"],
+        default="month",
+        help="How long each invoice covers. Defaults to month.",
+    )
+    invoices_parser.add_argument(
+        "--format",
+        action="append",
+        choices=["html", "csv"],
+        help="Only write invoices in this format. Can be repeated.",
+    )
+    invoices_parser.add_argument(
+        "-o",
+        "--output-dir",
+        default="invoices",
+        help=(
+            "Directory to write invoices to, as ACCOUNT/PERIOD.html and "
+            "ACCOUNT/PERIOD.csv. Defaults to ./invoices."
+        ),
+    )
+    invoices_parser.add_argument(
+        "-j",
+        "--jobs",
+        type=_positive_int,
+        help="Number of processes rendering invoices. Defaults to one per core.",
+    )
+    _add_filter_arguments(invoices_parser)
 
     start_parser = subparsers.add_parser(
         "start",
@@ -183,11 +473,26 @@ def parse_args(raw_args: list[str]) -> ParsedArgs:
     subparsers.add_parser("stop", help="Stop current task.")
     subparsers.add_parser("cancel", help="Delete current task.")
 
-    subparsers.add_parser(
+    upload_parser = subparsers.add_parser(
         "upload",
         aliases=["sync"],
-        help="Execute the file `upload` in the directory the log file is in.",
+        help=(
+            "Execute the file `upload` in the directory the log file is in, "
+            "unless the ledger hasn't changed since it last succeeded."
+        ),
+    )
+    upload_parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Run `upload` even if the ledger hasn't changed.",
     )
     subparsers.add_parser("log-path", help="Print the path of the log file then exit.")
+    subparsers.add_parser(
+        "daemon",
+        help=(
+            "Keep the ledger parsed in the background and serve other commands "
+            "from it over a Unix socket beside the ledger."
+        ),
+    )
 
     return ParsedArgs(parser.parse_args(raw_args))
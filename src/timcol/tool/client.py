@@ -0,0 +1,71 @@
+import json
+import os
+import socket
+import sys
+
+# Sub commands the daemon runs. The rest depend on the caller's terminal or
+# environment (ex: `edit` and `upload`, and the mutators, which timestamp tasks
+# with the caller's clock and timezone), or stream output that the daemon would
+# have to buffer (ex: `json`).
+COMMANDS = {
+    "reg",
+    "summary",
+    "csv",
+    "html",
+}
+
+
+def socket_path(log_path: str) -> str:
+    return f"{log_path}.sock"
+
+
+def _connect(log_path: str) -> socket.socket | None:
+    path = socket_path(log_path)
+    if not hasattr(socket, "AF_UNIX") or not os.path.exists(path):
+        return None
+
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        connection.connect(path)
+    except (ConnectionRefusedError, FileNotFoundError):
+        # Left behind by a daemon that didn't shut down cleanly
+        connection.close()
+        return None
+
+    return connection
+
+
+def is_running(log_path: str) -> bool:
+    connection = _connect(log_path)
+    if connection is None:
+        return False
+
+    connection.close()
+    return True
+
+
+def request(log_path: str, argv: list[str]) -> bool:
+    """Runs `argv` in the daemon serving `log_path`, if there is one.
+
+    Returns False without doing anything if no daemon is running, in which
+    case the caller should run the command itself.
+    """
+    connection = _connect(log_path)
+    if connection is None:
+        return False
+
+    with connection:
+        try:
+            connection.sendall(json.dumps({"argv": argv}).encode("utf8") + b"\n")
+            with connection.makefile("rb") as file:
+                response = json.loads(file.read())
+        except (OSError, json.JSONDecodeError):
+            # The daemon went away mid-request, and reports are safe to rerun
+            return False
+
+    sys.stdout.write(response["output"])
+    if response["error"] is not None:
+        sys.stderr.write(response["error"])
+        raise SystemExit(1)
+
+    return True
@@ -0,0 +1,87 @@
+import contextlib
+import io
+import itertools
+import json
+import os
+import signal
+import socketserver
+import sys
+import traceback
+import typing
+
+from .. import logfile
+from ..logfile import follow
+from . import args, client, main
+
+
+class _Ledger(follow.LedgerFollower):
+    def parse(self, log_path: str, parsed_args: args.ParsedArgs) -> logfile.LogFile:
+        log = self.refresh()
+        if main.windowed(parsed_args):
+            pending = [log.pending] if log.pending else []
+            return main.window(
+                itertools.chain(pending, reversed(log.entries)), parsed_args
+            )
+
+        if parsed_args.filter_args:
+            return parsed_args.filter_args.apply(log)
+
+        return log
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        ledger = typing.cast(_Server, self.server).ledger
+        line = self.rfile.readline()
+        if not line:
+            # Ex: `client.is_running` checking whether the daemon's up
+            return
+
+        argv: list[str] = json.loads(line)["argv"]
+
+        output = io.StringIO()
+        error = None
+        try:
+            with contextlib.redirect_stdout(output):
+                parsed_args = args.parse_args(argv)
+                main.run(parsed_args, ledger.log_path, ledger.parse)
+        except SystemExit:
+            # The command already printed why (ex: a pending task in an old shard)
+            error = ""
+        except Exception:
+            error = traceback.format_exc()
+
+        response = {"output": output.getvalue(), "error": error}
+        self.wfile.write(json.dumps(response).encode("utf8"))
+
+
+class _Server(socketserver.UnixStreamServer):
+    def __init__(self, log_path: str) -> None:
+        super().__init__(client.socket_path(log_path), _Handler)
+        self.ledger = _Ledger(log_path)
+
+
+def serve(log_path: str) -> None:
+    """Serves commands for the ledger at `log_path` until interrupted.
+
+    Requests are handled one at a time, each re-reading only what's been
+    appended to the ledger since the last.
+    """
+    path = client.socket_path(log_path)
+    if client.is_running(log_path):
+        print(f"Already being served at {path}")
+        return
+
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(path)
+
+    # Exit through the finally below when stopped by kill as well as Ctrl-C
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    with _Server(log_path) as server:
+        print(f"Serving {log_path} at {path}", flush=True)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            os.remove(path)
@@ -1,9 +1,17 @@
+import contextlib
+import datetime
+import functools
+import heapq
+import itertools
 import os
 import sys
+import time
+import typing
 
 from .upload import run_upload
 from .. import logfile
-from . import args, view_renderer, editor, mutators
+from ..logfile import directive, shards, tail, timerange
+from . import args, client, view_renderer, editor, mutators
 
 
 def find_log_path(parsed_args: args.ParsedArgs) -> str:
@@ -16,11 +24,171 @@ def find_log_path(parsed_args: args.ParsedArgs) -> str:
     return os.path.join(os.getcwd(), "ledger.dat")
 
 
+def _write_path(log_path: str) -> str:
+    try:
+        return shards.write_path(log_path)
+    except shards.ShardError as e:
+        print(e)
+        raise SystemExit(1)
+
+
+def _parse_filtered(
+    log_path: str, filter_args: args.ParsedArgs.FilterArgs
+) -> logfile.LogFile:
+    # Filtered results aren't worth caching so read the ledger directly
+    with open(log_path, "rb") as file:
+        return timerange.parse_range(
+            file,
+            filter_args.since,
+            filter_args.until,
+            filter_args.check_in_filter(),
+        )
+
+
+def windowed(parsed_args: args.ParsedArgs) -> bool:
+    """Returns whether only the end of the ledger is shown (ex: `reg --last`)."""
+    register_args = parsed_args.register_args
+    return register_args is not None and (
+        register_args.last is not None or register_args.days is not None
+    )
+
+
+def window(
+    newest_first: typing.Iterable[logfile.entry.Entry | directive.CheckIn],
+    parsed_args: args.ParsedArgs,
+) -> logfile.LogFile:
+    """Collects the end of the ledger shown by `reg --last` or `reg --days`.
+
+    `newest_first` is the ledger's pending check in and entries from last to
+    first, which are only read as far back as needed.
+    """
+    register_args = parsed_args.register_args
+    assert register_args
+    filter_args = parsed_args.filter_args
+    if filter_args and any(filter_args):
+        newest_first = (i for i in newest_first if filter_args.matches(_check_in(i)))
+
+    return tail.take_window(
+        newest_first, register_args.last, register_args.window_start()
+    )
+
+
+def _parse_window(log_path: str, parsed_args: args.ParsedArgs) -> logfile.LogFile:
+    with contextlib.ExitStack() as stack:
+        shards_newest_first = []
+        for path in reversed(shards.find_shards(log_path)):
+            try:
+                file = stack.enter_context(open(path, "rb"))
+            except FileNotFoundError:
+                continue
+
+            shards_newest_first.append(tail.reversed_entries(file))
+
+        return window(itertools.chain(*shards_newest_first), parsed_args)
+
+
+def _parse_log(log_path: str, parsed_args: args.ParsedArgs) -> logfile.LogFile:
+    if windowed(parsed_args):
+        # Only reads as much of the end of the ledger as is shown
+        return _parse_window(log_path, parsed_args)
+
+    filter_args = parsed_args.filter_args
+    parse = None
+    if filter_args and any(filter_args):
+        parse = functools.partial(_parse_filtered, filter_args=filter_args)
+
+    return shards.parse_shards(shards.find_shards(log_path), parse)
+
+
+def _check_in(i: logfile.entry.Entry | directive.CheckIn) -> directive.CheckIn:
+    return i if isinstance(i, directive.CheckIn) else i.check_in
+
+
+def _started_at(i: logfile.entry.Entry | directive.CheckIn) -> datetime.datetime:
+    return _check_in(i).timestamp
+
+
+def _stream_log(log_path: str, parsed_args: args.ParsedArgs) -> None:
+    filter_args = parsed_args.filter_args
+    assert filter_args
+    with contextlib.ExitStack() as stack:
+        ranges = []
+        for path in shards.find_shards(log_path):
+            try:
+                file = stack.enter_context(open(path, "rb"))
+            except FileNotFoundError:
+                continue
+
+            ranges.append(
+                timerange.iter_range(
+                    file,
+                    filter_args.since,
+                    filter_args.until,
+                    filter_args.check_in_filter(),
+                )
+            )
+
+        view_renderer.render_stream(
+            heapq.merge(*ranges, key=_started_at),
+            parsed_args,
+        )
+
+
+def _can_use_daemon(parsed_args: args.ParsedArgs) -> bool:
+    # Watching never finishes, so it follows the ledger itself instead
+    if parsed_args.register_args and parsed_args.register_args.watch:
+        return False
+
+    return parsed_args.sub_command in client.COMMANDS
+
+
+def _profile_output(parsed_args: args.ParsedArgs) -> str | None:
+    """Returns where to save cProfile stats, an empty string to only print the
+    phase timings, or None if the command isn't being profiled."""
+    if parsed_args.profile or parsed_args.profile_output:
+        return parsed_args.profile_output or ""
+
+    profile = os.environ.get("TIMCOL_PROFILE", "")
+    if profile.lower() in ("", "0", "false", "no", "off"):
+        return None
+    if profile.lower() in ("1", "true", "yes", "on"):
+        return ""
+
+    return profile
+
+
 def main(argv: list[str] = sys.argv[1:]) -> None:
+    started = time.perf_counter()
     parsed_args = args.parse_args(argv)
 
     log_path = find_log_path(parsed_args)
 
+    profile_output = _profile_output(parsed_args)
+    if profile_output is not None:
+        from . import profiling
+
+        # Always runs in process, so the daemon's work is measured too
+        with profiling.profiled(
+            log_path, time.perf_counter() - started, profile_output
+        ):
+            run(parsed_args, log_path)
+        return
+
+    if _can_use_daemon(parsed_args) and client.request(log_path, argv):
+        return
+
+    run(parsed_args, log_path)
+
+
+def run(
+    parsed_args: args.ParsedArgs,
+    log_path: str,
+    parse_log: typing.Callable[[str, args.ParsedArgs], logfile.LogFile] = _parse_log,
+) -> None:
+    """Runs the sub command in `parsed_args` against the ledger at `log_path`.
+
+    Reports are rendered from whatever `parse_log` returns.
+    """
     match parsed_args.sub_command:
         case "log-path":
             print(log_path)
@@ -28,26 +196,40 @@ def main(argv: list[str] = sys.argv[1:]) -> None:
             editor.open_in_editor(log_path)
         case "start":
             assert parsed_args.start_args
-            mutators.start(log_path, parsed_args.start_args)
+            mutators.start(_write_path(log_path), parsed_args.start_args)
         case "resume":
-            mutators.resume(log_path)
+            mutators.resume(_write_path(log_path))
         case "swap":
             assert parsed_args.start_args
-            mutators.swap(log_path, parsed_args.start_args)
+            mutators.swap(_write_path(log_path), parsed_args.start_args)
         case "stop":
-            mutators.stop(log_path)
+            mutators.stop(_write_path(log_path))
         case "cancel":
-            mutators.cancel(log_path)
+            mutators.cancel(_write_path(log_path))
         case "backfill":
             assert parsed_args.backfill_args
-            mutators.backfill(log_path, parsed_args.backfill_args)
+            mutators.backfill(_write_path(log_path), parsed_args.backfill_args)
         case "upload":
-            run_upload(log_path)
+            assert parsed_args.upload_args
+            run_upload(log_path, parsed_args.upload_args)
+        case "daemon":
+            # Only the daemon needs the server side
+            from . import daemon
+
+            daemon.serve(log_path)
+        case "reg" if parsed_args.register_args and parsed_args.register_args.watch:
+            view_renderer.watch(log_path, parsed_args)
+        case "csv" if parsed_args.csv_args and parsed_args.csv_args.stream:
+            _stream_log(log_path, parsed_args)
+        case "json":
+            _stream_log(log_path, parsed_args)
         case _:
             try:
-                with open(log_path, encoding="utf8") as file:
-                    log = logfile.parse_file(file)
+                log = parse_log(log_path, parsed_args)
             except FileNotFoundError:
                 log = logfile.LogFile([], None)
+            except shards.ShardError as e:
+                print(e)
+                raise SystemExit(1)
 
             view_renderer.render(log, parsed_args)
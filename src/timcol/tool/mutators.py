@@ -1,86 +1,126 @@
+import contextlib
 import datetime
+import os
+import typing
 
 from .args import ParsedArgs
 from .. import logfile
+from ..logfile import tail
 
+try:
+    import fcntl
+except ImportError:
+    # Advisory locks aren't available on Windows, so mutators run unlocked
+    fcntl = None
 
-def _get_pending_directive(log_path: str) -> logfile.directive.CheckIn | None:
-    try:
-        with open(log_path, encoding="utf8") as file:
-            return logfile.parse_file(file).pending
-    except FileNotFoundError:
-        return None
+
+@contextlib.contextmanager
+def _locked(log_path: str, create: bool = True) -> typing.Iterator[typing.BinaryIO]:
+    """Opens the ledger for appending while holding an exclusive lock on it.
+
+    The lock is held until the ledger is closed, so checking for a pending task
+    and then writing happens atomically with respect to other mutators.
+    """
+    if not create and not os.path.exists(log_path):
+        raise FileNotFoundError(log_path)
+
+    with open(log_path, "a+b", buffering=0) as file:
+        if fcntl is not None:
+            fcntl.flock(file.fileno(), fcntl.LOCK_EX)
+        yield file
+
+
+def _append(file: typing.BinaryIO, text: str) -> None:
+    # Unbuffered so each record is a single O_APPEND write, which can't be
+    # interleaved with writes from anything that doesn't take the lock.
+    file.write(text.encode("utf8"))
 
 
 def _get_timestamp() -> str:
     return datetime.datetime.now().strftime(logfile.directive.TIME_FORMAT)
 
 
-def start(log_path: str, args: ParsedArgs.StartArgs) -> None:
-    if _get_pending_directive(log_path):
+def _start(file: typing.BinaryIO, args: ParsedArgs.StartArgs) -> None:
+    if tail.find_pending(file):
         print("Task already pending.")
     else:
-        with open(log_path, "a", encoding="utf8") as file:
-            file.write(f"i {_get_timestamp()} {args.account}  {args.description}\n")
+        _append(file, f"i {_get_timestamp()} {args.account}  {args.description}\n")
 
 
-def stop(log_path: str) -> bool:
-    if not _get_pending_directive(log_path):
+def start(log_path: str, args: ParsedArgs.StartArgs) -> None:
+    with _locked(log_path) as file:
+        _start(file, args)
+
+
+def _stop(file: typing.BinaryIO) -> bool:
+    if not tail.find_pending(file):
         print("No task to stop.")
         return False
 
-    with open(log_path, "a", encoding="utf8") as file:
-        file.write(f"o {_get_timestamp()}\n")
+    _append(file, f"o {_get_timestamp()}\n")
     return True
 
 
-def cancel(log_path: str) -> None:
-    pending = _get_pending_directive(log_path)
-    if not pending:
-        print("No task to cancel.")
-        return
-
-    with open(log_path, "r", encoding="utf8") as file:
-        lines = file.readlines()
+def stop(log_path: str) -> bool:
+    try:
+        with _locked(log_path, create=False) as file:
+            return _stop(file)
+    except FileNotFoundError:
+        print("No task to stop.")
+        return False
 
-    while lines:
-        line = lines.pop().strip()
 
-        if line:
+def cancel(log_path: str) -> None:
+    try:
+        with _locked(log_path, create=False) as file:
+            if not tail.find_pending(file):
+                print("No task to cancel.")
+                return
+
+            # Drop the last line (and any blank lines after it) in place so
+            # only the tail of the ledger is read and nothing before it is
+            # rewritten
+            last_line = tail.find_last_line(file)
+            assert last_line
+            offset, line = last_line
             print(f"-{line}")
-            break
-
-    with open(log_path, "w", encoding="utf8") as file:
-        file.writelines(lines)
+            file.truncate(offset)
+    except FileNotFoundError:
+        print("No task to cancel.")
 
 
 def swap(log_path: str, args: ParsedArgs.StartArgs) -> None:
-    if stop(log_path):
-        start(log_path, args)
+    # Held across both so no other task can start in between
+    with _locked(log_path) as file:
+        if _stop(file):
+            _start(file, args)
 
 
 def resume(log_path: str) -> None:
     try:
-        with open(log_path, encoding="utf8") as file:
-            logs = logfile.parse_file(file)
+        with _locked(log_path, create=False) as file:
+            if tail.find_pending(file):
+                print("Task already pending.")
+                return
+
+            last_entry = tail.find_last_entry(file)
+            if not last_entry:
+                print("No task to resume.")
+                return
+
+            _append(
+                file,
+                f"i {_get_timestamp()} {last_entry.account}  {last_entry.task}\n",
+            )
     except FileNotFoundError:
-        logs = None
-
-    if not logs or not logs.entries:
         print("No task to resume.")
-        return
-    if logs.pending:
-        print("Task already pending.")
-
-    last_entry = logs.entries[-1]
-
-    with open(log_path, "a", encoding="utf8") as file:
-        file.write(f"i {_get_timestamp()} {last_entry.account}  {last_entry.task}\n")
 
 
 def backfill(log_path: str, args: ParsedArgs.BackfillArgs) -> None:
     in_timestamp = args.start.strftime(logfile.directive.TIME_FORMAT)
     out_timestamp = (args.start + args.duration).strftime(logfile.directive.TIME_FORMAT)
-    with open(log_path, "a", encoding="utf8") as file:
-        file.write(f"i {in_timestamp} {args.account}  {args.description}\n")
-        file.write(f"o {out_timestamp}\n")
+    with _locked(log_path) as file:
+        _append(
+            file,
+            f"i {in_timestamp} {args.account}  {args.description}\no {out_timestamp}\n",
+        )
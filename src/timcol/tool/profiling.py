@@ -0,0 +1,178 @@
+import contextlib
+import os
+import sys
+import time
+import typing
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows, where peak memory isn't reported
+    resource = None
+
+from ..logfile import cache, phases, shards
+
+# Phases in the order they're reported
+PHASES = [
+    "parse args",
+    "read",
+    "parse directives",
+    "pair entries",
+    "render",
+    "other",
+]
+
+
+def _peak_rss() -> int | None:
+    if resource is None:
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in bytes on macOS but kilobytes everywhere else
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class Profiler:
+    """Records the wall time spent in each phase of running a command.
+
+    Phases nest, and time spent in an inner phase only counts towards it and
+    not the phase it was entered from. So the phases add up to the total.
+
+    Growth in the process's peak memory is sampled at most every
+    `SAMPLE_INTERVAL` seconds, when switching phases, and is attributed to the
+    phase being switched away from.
+    """
+
+    SAMPLE_INTERVAL = 0.001
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.seconds: typing.Dict[str, float] = {}
+        self.growth: typing.Dict[str, int] = {}
+        self.entries = 0
+        self.initial_rss = _peak_rss()
+        self._rss = self.initial_rss
+        self._sampled = self.started
+        # The phase being timed and when it was entered or last resumed
+        self._stack: typing.List[typing.List[typing.Any]] = [["other", self.started]]
+
+    def enter(self, name: str) -> None:
+        now = time.perf_counter()
+        self._pause(now)
+        self._stack.append([name, now])
+
+    def exit(self) -> None:
+        now = time.perf_counter()
+        self._pause(now)
+        self._stack.pop()
+        self._stack[-1][1] = now
+
+    def _pause(self, now: float, sample: bool = False) -> None:
+        name, resumed = self._stack[-1]
+        self.seconds[name] = self.seconds.get(name, 0.0) + now - resumed
+
+        if self._rss is not None and (
+            sample or now - self._sampled >= self.SAMPLE_INTERVAL
+        ):
+            rss = _peak_rss() or 0
+            self.growth[name] = self.growth.get(name, 0) + rss - self._rss
+            self._rss = rss
+            self._sampled = now
+
+    def add(self, name: str, seconds: float) -> None:
+        """Records `seconds` that were spent in `name` before profiling began."""
+        self.started -= seconds
+        self.seconds[name] = self.seconds.get(name, 0.0) + seconds
+
+    def report(self, log_path: str) -> str:
+        """Returns a breakdown of the time and memory used by each phase."""
+        now = time.perf_counter()
+        self._pause(now, sample=True)
+        total = now - self.started
+
+        lines = [f"{'phase':<18}{'seconds':>10}{'share':>8}{'peak RSS +':>12}"]
+        for name in PHASES:
+            seconds = self.seconds.get(name)
+            if seconds is None:
+                continue
+
+            growth = self.growth.get(name)
+            pretty_growth = "" if growth is None else _megabytes(growth)
+            lines.append(
+                f"{name:<18}{seconds:>10.4f}{seconds / total:>8.0%}{pretty_growth:>12}"
+            )
+        lines.append(f"{'total':<18}{total:>10.4f}")
+
+        if self._rss is not None and self.initial_rss is not None:
+            lines.append(
+                f"Peak RSS {_megabytes(self._rss)}, "
+                f"{_megabytes(self.initial_rss)} of it before the command ran"
+            )
+
+        parsing = sum(
+            self.seconds.get(i, 0.0)
+            for i in ("read", "parse directives", "pair entries")
+        )
+        rate = f", {self.entries / parsing:,.0f} entries/sec" if parsing else ""
+        lines.append(
+            f"{_count_lines(log_path):,} lines, {self.entries:,} entries{rate}"
+        )
+        return "\n".join(lines)
+
+
+def _megabytes(size: int) -> str:
+    return f"{size / (1 << 20):.1f} MB"
+
+
+def _count_lines(log_path: str) -> int:
+    lines = 0
+    for path in shards.find_shards(log_path):
+        with contextlib.suppress(FileNotFoundError), open(path, "rb") as file:
+            while chunk := file.read(cache.CHUNK_SIZE):
+                lines += chunk.count(b"\n")
+
+    return lines
+
+
+@contextlib.contextmanager
+def instrument(profiler: Profiler) -> typing.Iterator[None]:
+    """Times each phase of parsing and rendering the ledger while active.
+
+    Reading covers loading the cache and the rest of the ledger's bytes, except
+    for lines read one at a time as they're parsed (ex: when filtering), which
+    count towards parsing directives.
+    """
+    previous = phases.recorder
+    phases.recorder = profiler
+    try:
+        yield
+    finally:
+        phases.recorder = previous
+
+
+@contextlib.contextmanager
+def profiled(
+    log_path: str, parse_seconds: float, output: str | None
+) -> typing.Iterator[None]:
+    """Prints a breakdown of where the time went to stderr once done.
+
+    `parse_seconds` is how long parsing arguments took, which happens before
+    the command can be profiled. Also saves cProfile stats to `output` if it's
+    given.
+    """
+    profiler = Profiler()
+    profiler.add("parse args", parse_seconds)
+    try:
+        with contextlib.ExitStack() as stack:
+            stack.enter_context(instrument(profiler))
+            if output:
+                import cProfile
+
+                c_profile = stack.enter_context(cProfile.Profile())
+                stack.callback(c_profile.dump_stats, output)
+
+            yield
+    finally:
+        print(profiler.report(log_path), file=sys.stderr)
+        if output:
+            print(f"Saved cProfile stats to {os.path.abspath(output)}", file=sys.stderr)
@@ -1,13 +1,107 @@
+import contextlib
+import hashlib
 import os
 import subprocess
+import typing
 
+from ..logfile import cache, pickled, shards
+from .args import ParsedArgs
 
-def run_upload(log_path: str):
+STAMP_VERSION = 1
+
+
+class _Uploaded(typing.NamedTuple):
+    size: int
+    digest: bytes
+
+
+class _Stamp(typing.NamedTuple):
+    """What each ledger looked like the last time `upload` succeeded."""
+
+    version: int
+    ledgers: dict[str, _Uploaded]
+
+
+def stamp_path(sync_path: str) -> str:
+    return f"{sync_path}.stamp"
+
+
+def _load_stamp(sync_path: str) -> dict[str, _Uploaded]:
+    # Without a stamp everything is uploaded, same as before stamps existed
+    stamp = pickled.load(stamp_path(sync_path), _Stamp)
+    if stamp is None or stamp.version != STAMP_VERSION:
+        return {}
+
+    return stamp.ledgers
+
+
+def _store_stamp(sync_path: str, ledgers: dict[str, _Uploaded]) -> None:
+    pickled.store(stamp_path(sync_path), _Stamp(STAMP_VERSION, ledgers))
+
+
+def _snapshot(path: str, previous: _Uploaded | None) -> typing.Tuple[_Uploaded, int]:
+    """Returns the current state of the ledger at `path`, along with the offset
+    up to which it's unchanged since `previous`.
+
+    The mutators only append, so after hashing the previously uploaded prefix
+    only the bytes after it need hashing.
+    """
+    with open(path, "rb") as file:
+        size = os.fstat(file.fileno()).st_size
+        digest = hashlib.sha1(usedforsecurity=False)
+        offset = 0
+        if previous is not None and previous.size <= size:
+            cache.hash_range(file, digest, 0, previous.size)
+            if digest.digest() == previous.digest:
+                offset = previous.size
+            else:
+                digest = hashlib.sha1(usedforsecurity=False)
+
+        cache.hash_range(file, digest, offset, size)
+
+    return _Uploaded(size, digest.digest()), offset
+
+
+def run_upload(log_path: str, args: ParsedArgs.UploadArgs):
+    """Runs the `upload` script beside the ledger if it changed since the
+    script last succeeded.
+
+    The script is told what changed through environment variables:
+    `TIMCOL_LEDGER` is the ledger new tasks are appended to, and the bytes of
+    it from `TIMCOL_UPLOAD_OFFSET` up to `TIMCOL_UPLOAD_END` are the ones that
+    haven't been uploaded yet. `TIMCOL_UPLOAD_CHANGED` lists every ledger that
+    changed (ex: after an include was edited), separated by `os.pathsep`.
+    """
     log_dir_path = os.path.dirname(log_path)
     sync_path = os.path.join(log_dir_path, "upload")
+
+    previous = _load_stamp(sync_path)
+    current: dict[str, _Uploaded] = {}
+    offsets: dict[str, int] = {}
+    for path in shards.find_shards(log_path):
+        path = os.path.abspath(path)
+        with contextlib.suppress(FileNotFoundError):
+            current[path], offsets[path] = _snapshot(path, previous.get(path))
+
+    changed = [path for path, state in current.items() if previous.get(path) != state]
+    if not args.force and not changed and previous.keys() == current.keys():
+        print("Ledger unchanged since the last upload, skipping (see --force)")
+        return
+
+    env = dict(os.environ, TIMCOL_UPLOAD_CHANGED=os.pathsep.join(changed))
+    if current:
+        ledger = list(current)[-1]
+        env.update(
+            TIMCOL_LEDGER=ledger,
+            TIMCOL_UPLOAD_OFFSET=str(offsets[ledger]),
+            TIMCOL_UPLOAD_END=str(current[ledger].size),
+        )
+
     try:
-        subprocess.run(sync_path, check=True)
+        subprocess.run(sync_path, check=True, env=env)
     except FileNotFoundError:
         print(f"Does not exist: {sync_path}")
     except PermissionError:
         print(f"Not executable: {sync_path}")
+    else:
+        _store_stamp(sync_path, current)
@@ -1,17 +1,84 @@
+import typing
+
 from .. import logfile
+from ..logfile import phases
 from . import args
-from .views import register, csv, html
+
+# Each view is imported only when it's rendered since some depend on modules
+# that are slow to import (ex: tabulate and pystache).
 
 
+@phases.timed("render")
 def render(logs: logfile.LogFile, parsed_args: args.ParsedArgs) -> None:
     if parsed_args.sub_command == "reg":
+        from .views import register
+
         assert parsed_args.register_args is not None
         register.render(logs, parsed_args.register_args)
+    elif parsed_args.sub_command == "summary":
+        from .views import summary
+
+        assert parsed_args.summary_args is not None
+        summary.render(logs, parsed_args.summary_args)
     elif parsed_args.sub_command == "csv":
+        from .views import csv
+
         assert parsed_args.csv_args is not None
         csv.render(logs, parsed_args.csv_args)
     elif parsed_args.sub_command == "html":
+        from .views import html
+
         assert parsed_args.html_args is not None
         html.render(logs, parsed_args.html_args)
+    elif parsed_args.sub_command == "json":
+        from .views import json
+
+        assert parsed_args.json_args is not None
+        json.render(logs, parsed_args.json_args)
+    elif parsed_args.sub_command == "invoices":
+        from .views import invoices
+
+        assert parsed_args.invoices_args is not None
+        invoices.render(logs, parsed_args.invoices_args)
     else:
         raise NotImplementedError()
+
+
+@phases.timed("render")
+def render_stream(
+    entries: typing.Iterable[logfile.entry.Entry | logfile.directive.CheckIn],
+    parsed_args: args.ParsedArgs,
+) -> None:
+    if parsed_args.sub_command == "csv":
+        from .views import csv
+
+        assert parsed_args.csv_args is not None
+        csv.render_entries(entries, parsed_args.csv_args)
+    elif parsed_args.sub_command == "json":
+        from .views import json
+
+        assert parsed_args.json_args is not None
+        json.render_entries(entries, parsed_args.json_args)
+    else:
+        raise NotImplementedError()
+
+
+def watch(log_path: str, parsed_args: args.ParsedArgs) -> None:
+    from ..logfile import follow
+    from .views import register
+
+    assert parsed_args.register_args is not None
+    follower = follow.LedgerFollower(log_path)
+    filter_args = parsed_args.filter_args
+    filtered = (follower.log, follower.log)
+
+    def refresh() -> logfile.LogFile:
+        nonlocal filtered
+        log = follower.refresh()
+        # Only filter again when the ledger has changed
+        if filter_args and log is not filtered[0]:
+            filtered = (log, filter_args.apply(log))
+
+        return filtered[1] if filter_args else log
+
+    register.watch(refresh, parsed_args.register_args)
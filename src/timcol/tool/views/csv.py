@@ -1,8 +1,10 @@
 import datetime
 import csv
 import sys
+import typing
 
 from ... import logfile
+from ...logfile.entry import Entry
 from ..args import ParsedArgs
 from ._shared import pretty_duration
 
@@ -12,6 +14,18 @@ def total_hours(duration: datetime.timedelta) -> float:
 
 
 def render(logs: logfile.LogFile, args: ParsedArgs.CsvArgs) -> None:
+    render_entries(logs.entries, args)
+
+
+def render_entries(
+    entries: typing.Iterable[Entry | logfile.directive.CheckIn],
+    args: ParsedArgs.CsvArgs,
+) -> None:
+    """Writes a row for each entry as it's produced by `entries`.
+
+    Works with `logfile.iter_entries` to export without holding the whole
+    ledger in memory. Pending tasks are skipped.
+    """
     writer = csv.DictWriter(
         sys.stdout,
         fieldnames=[
@@ -25,7 +39,10 @@ def render(logs: logfile.LogFile, args: ParsedArgs.CsvArgs) -> None:
     writer.writeheader()
 
     total_cost = 0
-    for i in logs.entries:
+    for i in entries:
+        if not isinstance(i, Entry):
+            continue
+
         base_rate = (
             float(i.metadata.get("Rate", args.rate))
             if args.allow_rate_override
@@ -1,23 +1,106 @@
+import contextlib
 import datetime
-import sys
-from typing import List, Dict
+import functools
+import hashlib
+import html
 import importlib.resources
-
-import pystache
+import os
+import sys
+from typing import Dict, Iterator, NamedTuple, Tuple
 
 from ... import logfile
+from ...logfile import pickled
+from ...logfile.entry import Entry
 from ..args import ParsedArgs
 from ._shared import pretty_duration
 
+TEMPLATE_NAME = "invoice_template.htm.mustache"
+
+# Number of task rows rendered per write to stdout
+CHUNK_ROWS = 1000
+
+
+class _CompiledTemplate(NamedTuple):
+    """The invoice template split around its `tasks` section.
+
+    Each part is a `str.format` string whose fields are the template's
+    variables, which must be HTML-escaped before being filled in.
+    """
+
+    head: str
+    row: str
+    tail: str
+
 
 def total_hours(duration: datetime.timedelta) -> float:
     return duration.total_seconds() / 60**2
 
 
-def render(logs: logfile.LogFile, args: ParsedArgs.HtmlArgs) -> None:
-    tasks: List[Dict[str, str]] = []
-    total_cost = 0
-    total_time = datetime.timedelta()
+def _cache_dir() -> str:
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(base, "timcol")
+
+
+def _to_format(parse_tree: list) -> str:
+    from pystache import parser
+
+    parts = []
+    for node in parse_tree:
+        if isinstance(node, str):
+            parts.append(node.replace("{", "{{").replace("}", "}}"))
+        elif isinstance(node, parser._EscapeNode) and node.key.isidentifier():
+            parts.append(f"{{{node.key}}}")
+        else:
+            raise ValueError(f"Unsupported tag in invoice template: {node!r}")
+
+    return "".join(parts)
+
+
+def _compile(template: str) -> _CompiledTemplate:
+    from pystache import parser
+
+    parse_tree = parser.parse(template)._parse_tree
+    (section,) = [
+        i
+        for i, node in enumerate(parse_tree)
+        if isinstance(node, parser._SectionNode) and node.key == "tasks"
+    ]
+    return _CompiledTemplate(
+        head=_to_format(parse_tree[:section]),
+        row=_to_format(parse_tree[section].parsed._parse_tree),
+        tail=_to_format(parse_tree[section + 1 :]),
+    )
+
+
+@functools.cache
+def _load_template() -> _CompiledTemplate:
+    """Returns the compiled invoice template.
+
+    Compiling requires pystache, which is slow to import, so the result is
+    cached across runs keyed on the template's hash.
+    """
+    assert __package__
+    template = importlib.resources.files(__package__).joinpath(TEMPLATE_NAME)
+    source = template.read_text(encoding="utf8")
+    digest = hashlib.sha1(source.encode("utf8")).hexdigest()
+    path = os.path.join(_cache_dir(), f"invoice-{digest}.pickle")
+
+    compiled = pickled.load(path, _CompiledTemplate)
+    if compiled is not None:
+        return compiled
+
+    compiled = _compile(source)
+    with contextlib.suppress(OSError):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    pickled.store(path, compiled)
+
+    return compiled
+
+
+def _priced(
+    logs: logfile.LogFile, args: ParsedArgs.HtmlArgs
+) -> Iterator[Tuple[Entry, float, float]]:
+    """Yields each entry along with its hourly rate and cost."""
     for i in logs.entries:
         base_rate = (
             float(i.metadata.get("Rate", args.rate))
@@ -27,30 +110,44 @@ def render(logs: logfile.LogFile, args: ParsedArgs.HtmlArgs) -> None:
         multiplier = float(i.metadata.get("Multiplier", 1.0))
         rate = base_rate * multiplier
 
-        cost = total_hours(i.duration) * rate
-        total_cost += cost
+        yield i, rate, total_hours(i.duration) * rate
 
-        total_time += i.duration
 
-        tasks.append(
-            {
-                "date": i.check_in.timestamp.strftime("%Y/%m/%d"),
-                "duration": pretty_duration(i.duration),
-                "hourly_rate": f"${rate:.2f}",
-                "cost": f"${cost:.2f}",
-                "description": i.task,
-            }
-        )
+def _escaped(values: Dict[str, str]) -> Dict[str, str]:
+    return {k: html.escape(v, quote=True) for k, v in values.items()}
+
+
+def render(logs: logfile.LogFile, args: ParsedArgs.HtmlArgs) -> None:
+    template = _load_template()
+
+    # The totals come before the tasks in the invoice, so they're added up in
+    # a first pass and the task rows are rendered in a second.
+    total_cost = 0
+    total_time = datetime.timedelta()
+    for i, _, cost in _priced(logs, args):
+        total_cost += cost
+        total_time += i.duration
 
     data = {
         "date": datetime.date.today().strftime("%Y/%m/%d"),
         "cost": f"${total_cost:,.2f}",
         "duration": pretty_duration(total_time),
-        "tasks": tasks,
     }
+    sys.stdout.write(template.head.format_map(_escaped(data)))
 
-    assert __package__
-    with importlib.resources.open_text(
-        __package__, "invoice_template.htm.mustache"
-    ) as template:
-        sys.stdout.write(pystache.render(template.read(), data))
+    chunk = []
+    for i, rate, cost in _priced(logs, args):
+        task = {
+            "date": i.check_in.timestamp.strftime("%Y/%m/%d"),
+            "duration": pretty_duration(i.duration),
+            "hourly_rate": f"${rate:.2f}",
+            "cost": f"${cost:.2f}",
+            "description": i.task,
+        }
+        chunk.append(template.row.format_map(_escaped(task)))
+        if len(chunk) >= CHUNK_ROWS:
+            sys.stdout.write("".join(chunk))
+            chunk.clear()
+
+    sys.stdout.write("".join(chunk))
+    sys.stdout.write(template.tail.format_map(_escaped(data)))
@@ -0,0 +1,137 @@
+import collections
+import concurrent.futures
+import contextlib
+import datetime
+import hashlib
+import os
+import re
+import typing
+
+from ... import logfile
+from ...logfile import entry
+from ..args import ParsedArgs
+from . import csv, html
+
+# Names each invoice's file given the day its entries started on
+_PERIOD_FORMATS = {
+    "day": "%Y-%m-%d",
+    "week": "%G-W%V",
+    "month": "%Y-%m",
+    "year": "%Y",
+}
+
+
+class _Invoice(typing.NamedTuple):
+    # Where to write the invoice, minus the extension of each format
+    base_path: str
+    rows: list[entry.Row]
+    rate: float
+    allow_rate_override: bool
+    formats: list[str]
+
+
+def _file_name(account: str) -> str:
+    # Accounts can contain anything but a double space, including slashes
+    name = re.sub(r"[^\w.-]+", "_", account)
+    return "_" if name in ("", ".", "..") else name
+
+
+def _file_names(accounts: typing.Iterable[str]) -> dict[str, str]:
+    """Maps each account to the directory its invoices are written to.
+
+    Accounts whose names would collide (ex: `Client:A/B` and `Client:A B`, or
+    ones that only differ in case) get a short hash of the account appended so
+    that neither overwrites the other's invoices.
+    """
+    names = {i: _file_name(i) for i in accounts}
+    counts = collections.Counter(i.casefold() for i in names.values())
+    for account, name in names.items():
+        if counts[name.casefold()] > 1:
+            digest = hashlib.sha1(account.encode("utf8")).hexdigest()
+            names[account] = f"{name}-{digest[:8]}"
+
+    return names
+
+
+def partition(
+    entries: typing.Iterable[entry.Entry], period: str
+) -> dict[typing.Tuple[str, str], list[entry.Entry]]:
+    """Groups `entries` by account and the `period` they started in, keeping
+    each group in ledger order."""
+    period_format = _PERIOD_FORMATS[period]
+    labels: dict[datetime.date, str] = {}
+    groups: dict[typing.Tuple[str, str], list[entry.Entry]] = {}
+    for i in entries:
+        day = i.check_in.timestamp.date()
+        label = labels.get(day)
+        if label is None:
+            label = labels[day] = day.strftime(period_format)
+
+        groups.setdefault((i.account, label), []).append(i)
+
+    return groups
+
+
+def _write_invoice(invoice: _Invoice) -> list[str]:
+    """Writes `invoice` in each of its formats, returning the paths written."""
+    log = logfile.LogFile(list(map(entry.from_row, invoice.rows)), None)
+    os.makedirs(os.path.dirname(invoice.base_path), exist_ok=True)
+
+    paths = []
+    for invoice_format in invoice.formats:
+        path = f"{invoice.base_path}.{invoice_format}"
+        with open(path, "w", encoding="utf8", newline="") as file:
+            with contextlib.redirect_stdout(file):
+                if invoice_format == "html":
+                    html.render(
+                        log,
+                        ParsedArgs.HtmlArgs(invoice.rate, invoice.allow_rate_override),
+                    )
+                else:
+                    csv.render(
+                        log,
+                        ParsedArgs.CsvArgs(
+                            invoice.rate, invoice.allow_rate_override, False
+                        ),
+                    )
+        paths.append(path)
+
+    return paths
+
+
+def render(logs: logfile.LogFile, args: ParsedArgs.InvoicesArgs) -> None:
+    """Writes an invoice for each account and period to `args.output_dir`.
+
+    The ledger is only parsed once, and the invoices are rendered in a process
+    pool when there's more than one of them and more than one core. Pending
+    tasks aren't billed.
+    """
+    groups = sorted(partition(logs.entries, args.period).items())
+    file_names = _file_names(account for (account, _), _ in groups)
+    invoices = [
+        _Invoice(
+            os.path.join(args.output_dir, file_names[account], label),
+            [entry.to_row(i) for i in entries],
+            args.rates.get(account, args.rate),
+            args.allow_rate_override,
+            args.formats,
+        )
+        for (account, label), entries in groups
+    ]
+
+    workers = min(args.jobs or os.cpu_count() or 1, len(invoices))
+    with contextlib.ExitStack() as stack:
+        if workers < 2:
+            written = map(_write_invoice, invoices)
+        else:
+            if "html" in args.formats:
+                # Compiled once here rather than in every worker
+                html._load_template()
+
+            executor = stack.enter_context(
+                concurrent.futures.ProcessPoolExecutor(workers)
+            )
+            written = executor.map(_write_invoice, invoices)
+
+        for paths in written:
+            print("\n".join(paths))
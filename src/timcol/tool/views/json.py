@@ -0,0 +1,76 @@
+import itertools
+import json
+import sys
+import typing
+
+from ... import logfile
+from ...logfile.entry import Entry
+from ..args import ParsedArgs
+
+# Number of records written to stdout at a time
+CHUNK_RECORDS = 1000
+
+
+def _record(i: Entry | logfile.directive.CheckIn) -> dict[str, typing.Any]:
+    """Returns the JSON object for an entry or the pending task.
+
+    Timestamps are seconds since the Unix epoch, taking the ledger's times to
+    be in the local timezone. The pending task has no end or duration yet.
+    """
+    if isinstance(i, Entry):
+        return {
+            "start": int(i.check_in.timestamp.timestamp()),
+            "end": int(i.check_out.timestamp.timestamp()),
+            "seconds": int(i.duration.total_seconds()),
+            "account": i.account,
+            "task": i.task,
+            "metadata": dict(i.metadata),
+            "pending": False,
+        }
+
+    return {
+        "start": int(i.timestamp.timestamp()),
+        "end": None,
+        "seconds": None,
+        "account": i.account,
+        "task": i.task,
+        "metadata": dict(i.metadata),
+        "pending": True,
+    }
+
+
+def render(logs: logfile.LogFile, args: ParsedArgs.JsonArgs) -> None:
+    pending = [logs.pending] if logs.pending else []
+    render_entries(itertools.chain(logs.entries, pending), args)
+
+
+def render_entries(
+    entries: typing.Iterable[Entry | logfile.directive.CheckIn],
+    args: ParsedArgs.JsonArgs,
+) -> None:
+    """Writes a record for each entry as it's produced by `entries`.
+
+    Records are newline delimited unless `args.array` is set, in which case
+    they're written as the items of one JSON array.
+    """
+    encode = json.JSONEncoder(ensure_ascii=False).encode
+    if args.array:
+        sys.stdout.write("[")
+
+    count = 0
+    chunk = []
+    for i in entries:
+        if args.array:
+            chunk.append(",\n" if count else "\n")
+        chunk.append(encode(_record(i)))
+        if not args.array:
+            chunk.append("\n")
+
+        count += 1
+        if count % CHUNK_RECORDS == 0:
+            sys.stdout.write("".join(chunk))
+            chunk.clear()
+
+    sys.stdout.write("".join(chunk))
+    if args.array:
+        sys.stdout.write("\n]\n" if count else "]\n")
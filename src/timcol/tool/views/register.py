@@ -1,14 +1,20 @@
-from typing import Tuple, List, Dict
+from typing import Callable, Tuple, List, Dict
 import datetime
 import math
+import shutil
+import time
 from tabulate import tabulate
 
 from ..args import ParsedArgs
 
 from ... import logfile
+from ...logfile.directive import CheckIn
 from ...logfile.entry import Entry
 from ._shared import pretty_duration
 
+# Moves the cursor to the top left and clears the terminal
+CLEAR_SCREEN = "\x1b[H\x1b[2J"
+
 
 def floor_delta(delta: datetime.timedelta) -> datetime.timedelta:
     return datetime.timedelta(seconds=math.floor(delta.total_seconds()))
@@ -18,15 +24,23 @@ def scale(duration: datetime.timedelta, multiplier: float) -> datetime.timedelta
     return datetime.timedelta(seconds=duration.total_seconds() * multiplier)
 
 
-def render(logs: logfile.LogFile, args: ParsedArgs.RegisterArgs):
-    """Prints a human-readable summary of `logs`."""
-    total_time = datetime.timedelta(0)
-    day_total: Tuple[datetime.date, datetime.timedelta] | None = None
-    rows: List[Dict[str, str]] = []
-    for entry in [*logs.entries, logs.pending]:
-        if entry is None:
-            continue
+class _Register:
+    """Accumulates the register's rows one entry at a time."""
+
+    def __init__(self, args: ParsedArgs.RegisterArgs) -> None:
+        self.args = args
+        self.rows: List[Dict[str, str]] = []
+        self.day_total: Tuple[datetime.date, datetime.timedelta] | None = None
+        self.total_time = datetime.timedelta(0)
+
+    def fork(self) -> "_Register":
+        """Returns a register that continues from this one's totals."""
+        forked = _Register(self.args)
+        forked.day_total = self.day_total
+        forked.total_time = self.total_time
+        return forked
 
+    def add(self, entry: Entry | CheckIn) -> None:
         if isinstance(entry, Entry):
             check_in = entry.check_in
             duration = entry.duration
@@ -38,27 +52,30 @@ def render(logs: logfile.LogFile, args: ParsedArgs.RegisterArgs):
 
         multiplier = float(entry.metadata.get("Multiplier", 1.0))
 
-        if args.show_unscaled_time:
+        if self.args.show_unscaled_time:
             scaled_duration = duration
         else:
             scaled_duration = floor_delta(scale(duration, multiplier))
 
-        if day_total is not None and check_in.timestamp.date() != day_total[0]:
-            pretty_date = day_total[0].strftime("%h %d")
-            rows.append(
+        if (
+            self.day_total is not None
+            and check_in.timestamp.date() != self.day_total[0]
+        ):
+            pretty_date = self.day_total[0].strftime("%h %d")
+            self.rows.append(
                 {
                     "timestamp": f"{pretty_date} SUBTOTAL",
-                    "duration": pretty_duration(day_total[1]),
+                    "duration": pretty_duration(self.day_total[1]),
                 }
             )
-            rows.append({})
-            day_total = None
+            self.rows.append({})
+            self.day_total = None
 
-        if day_total is None:
-            day_total = (check_in.timestamp.date(), datetime.timedelta())
+        if self.day_total is None:
+            self.day_total = (check_in.timestamp.date(), datetime.timedelta())
 
-        day_total = (day_total[0], day_total[1] + scaled_duration)
-        total_time += scaled_duration
+        self.day_total = (self.day_total[0], self.day_total[1] + scaled_duration)
+        self.total_time += scaled_duration
 
         pretty_timestamp = datetime.datetime.strftime(
             check_in.timestamp, "%h %d @ %I:%M %p"
@@ -66,12 +83,12 @@ def render(logs: logfile.LogFile, args: ParsedArgs.RegisterArgs):
 
         if multiplier == 1.0:
             pretty_multiplier = ""
-        elif args.show_unscaled_time:
+        elif self.args.show_unscaled_time:
             pretty_multiplier = f" * {multiplier:1.1f}"
         else:
             pretty_multiplier = f" / {multiplier:1.1f}"
 
-        rows.append(
+        self.rows.append(
             {
                 "timestamp": pretty_timestamp,
                 "duration": f"{pretty_duration(scaled_duration)}{pretty_multiplier}{status}",
@@ -80,20 +97,117 @@ def render(logs: logfile.LogFile, args: ParsedArgs.RegisterArgs):
             }
         )
 
-    if day_total is not None:
-        pretty_date = day_total[0].strftime("%h %d")
+    def totals(self) -> List[Dict[str, str]]:
+        """Returns the rows that close the register, without changing it."""
+        rows: List[Dict[str, str]] = []
+        if self.day_total is not None:
+            pretty_date = self.day_total[0].strftime("%h %d")
+            rows.append(
+                {
+                    "timestamp": f"{pretty_date} SUBTOTAL",
+                    "duration": pretty_duration(self.day_total[1]),
+                }
+            )
+
         rows.append(
             {
-                "timestamp": f"{pretty_date} SUBTOTAL",
-                "duration": pretty_duration(day_total[1]),
+                "timestamp": "TOTAL TIME",
+                "duration": pretty_duration(self.total_time),
             }
         )
+        return rows
+
 
-    rows.append(
-        {
-            "timestamp": "TOTAL TIME",
-            "duration": pretty_duration(total_time),
-        }
-    )
+def _last_entries(rows: List[Dict[str, str]], count: int) -> List[Dict[str, str]]:
+    """Returns the rows from the `count`th to last entry onwards."""
+    for i in range(len(rows) - 1, -1, -1):
+        if "account" in rows[i]:
+            count -= 1
+            if count == 0:
+                return rows[i:]
 
-    print(tabulate(rows, headers="keys"))
+    return rows
+
+
+def render(logs: logfile.LogFile, args: ParsedArgs.RegisterArgs):
+    """Prints a human-readable summary of `logs`."""
+    register = _Register(args)
+    entries = [i for i in [*logs.entries, logs.pending] if i is not None]
+    hidden = 0 if args.last is None else max(len(entries) - args.last, 0)
+    for entry in entries[:hidden]:
+        register.add(entry)
+
+    # Earlier entries are only there to complete the first day's subtotal, so
+    # they don't count towards the total time
+    register.total_time = datetime.timedelta(0)
+    for entry in entries[hidden:]:
+        register.add(entry)
+
+    rows = register.rows
+    if args.last is not None:
+        rows = _last_entries(rows, args.last)
+
+    print(tabulate([*rows, *register.totals()], headers="keys"))
+
+
+class _Watcher:
+    """Keeps the register's rows up to date as entries are appended.
+
+    Only new entries are added to the running totals. Everything but the last
+    entry (which may still get metadata) and the pending task is final, unless
+    the ledger's been rewritten, in which case the register is started over.
+    """
+
+    def __init__(self, args: ParsedArgs.RegisterArgs) -> None:
+        self.args = args
+        self._register = _Register(args)
+        self._added = 0
+        self._last_added: Entry | None = None
+
+    def rows(
+        self, logs: logfile.LogFile, limit: int | None = None
+    ) -> List[Dict[str, str]]:
+        """Returns the register's rows for `logs`, or only the last `limit`."""
+        final = max(len(logs.entries) - 1, 0)
+        if final < self._added or (
+            self._added and logs.entries[self._added - 1] is not self._last_added
+        ):
+            self._register = _Register(self.args)
+            self._added = 0
+
+        for entry in logs.entries[self._added : final]:
+            self._register.add(entry)
+        if final > self._added:
+            self._added = final
+            self._last_added = logs.entries[final - 1]
+
+        tail = self._register.fork()
+        for entry in [*logs.entries[final:], logs.pending]:
+            if entry is not None:
+                tail.add(entry)
+
+        rows = self._register.rows if limit is None else self._register.rows[-limit:]
+        rows = [*rows, *tail.rows, *tail.totals()]
+        return rows if limit is None else rows[-limit:]
+
+
+def watch(
+    refresh: Callable[[], logfile.LogFile],
+    args: ParsedArgs.RegisterArgs,
+    interval: float = 1.0,
+):
+    """Redraws the end of the register every `interval` seconds until Ctrl-C.
+
+    `refresh` is called before each redraw and should be cheap when the ledger
+    hasn't changed.
+    """
+    watcher = _Watcher(args)
+    try:
+        while True:
+            # Leave room for the header and the cursor
+            limit = max(shutil.get_terminal_size().lines - 3, 1)
+            table = tabulate(watcher.rows(refresh(), limit), headers="keys")
+            print(f"{CLEAR_SCREEN}{table}", flush=True)
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
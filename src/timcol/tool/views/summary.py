@@ -0,0 +1,78 @@
+import datetime
+from typing import Callable, Dict, List
+from tabulate import tabulate
+
+from ..args import ParsedArgs
+
+from ... import logfile
+from ...logfile import columns
+from . import register
+from ._shared import pretty_duration
+
+# Labels each group of entries given the day (counted from `columns.EPOCH`)
+# they started on
+_DAY_LABELS: Dict[str, Callable[[datetime.date], str]] = {
+    "day": lambda day: day.strftime("%Y/%m/%d"),
+    "week": lambda day: day.strftime("%G W%V"),
+    "month": lambda day: day.strftime("%Y/%m"),
+}
+
+
+def _scaled_seconds(seconds: float, multiplier: float) -> float:
+    duration = datetime.timedelta(seconds=seconds)
+    return register.floor_delta(register.scale(duration, multiplier)).total_seconds()
+
+
+def render(logs: logfile.LogFile, args: ParsedArgs.SummaryArgs) -> None:
+    """Prints the total time of `logs` grouped by `args.by`."""
+    now = datetime.datetime.now()
+    table = columns.from_log(logs, now)
+
+    durations = columns.subtract(table.stop, table.start)
+    if not args.show_unscaled_time:
+        durations = columns.map_pairs(_scaled_seconds, durations, table.multiplier)
+
+    if args.by in _DAY_LABELS:
+        keys = columns.days(table.start)
+        epoch = columns.EPOCH.date()
+        to_label = _DAY_LABELS[args.by]
+
+        def label(key: int) -> str:
+            return to_label(epoch + datetime.timedelta(days=key))
+
+    else:
+        if args.by == "account":
+            keys, labels = table.account, table.accounts
+        else:
+            keys, labels = columns.metadata_column(logs, args.by)
+
+        def label(key: int) -> str:
+            return labels[key] or "(none)"
+
+    # Days are grouped first and then rolled up into weeks and months, which
+    # only touches each distinct day once.
+    totals: Dict[str, List[float]] = {}
+    for group in columns.group_sum(keys, durations):
+        total = totals.setdefault(label(group.key), [0, 0.0])
+        total[0] += group.entries
+        total[1] += group.total
+
+    rows = [
+        {
+            args.by: key,
+            "entries": int(count),
+            "duration": pretty_duration(datetime.timedelta(seconds=seconds)),
+        }
+        for key, (count, seconds) in sorted(totals.items())
+    ]
+    rows.append(
+        {
+            args.by: "TOTAL",
+            "entries": len(table.start),
+            "duration": pretty_duration(
+                datetime.timedelta(seconds=sum(i[1] for i in totals.values()))
+            ),
+        }
+    )
+
+    print(tabulate(rows, headers="keys"))
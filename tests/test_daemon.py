@@ -0,0 +1,89 @@
+import socket
+import threading
+
+import pytest
+
+from timcol.tool import client, daemon
+from timcol.tool.main import main
+
+
+@pytest.fixture()
+def server(tmp_path):
+    log_path = str(tmp_path / "ledger.dat")
+    with daemon._Server(log_path) as server:
+        thread = threading.Thread(target=server.serve_forever)
+        thread.start()
+        try:
+            yield server
+        finally:
+            server.shutdown()
+            thread.join()
+
+
+def test_commands_run_in_daemon(server, capsys):
+    log_path = server.ledger.log_path
+    assert client.is_running(log_path)
+
+    main(["-f", log_path, "backfill", "Account1", "Task 1", "2023/07/30 09:00", "1h"])
+    main(["-f", log_path, "start", "Account2", "Task 2"])
+    main(["-f", log_path, "start", "Account2", "Task 3"])
+    assert capsys.readouterr().out == "Task already pending.\n"
+
+    # Only reports are served, tasks are timestamped by the calling process
+    assert not server.ledger._followers
+    main(["-f", log_path, "csv", "100"])
+    served = capsys.readouterr().out
+    assert server.ledger._followers
+
+    main(["-f", log_path, "csv", "100", "--account", "Account2"])
+    assert capsys.readouterr().out.splitlines() == [
+        "Date,Duration,Rate,Cost,Description",
+        ",,,$0.00,TOTAL COST",
+    ]
+
+    # Falls back to running in process once the daemon's gone
+    server.shutdown()
+    server.server_close()
+    assert not client.is_running(log_path)
+    main(["-f", log_path, "csv", "100"])
+    assert capsys.readouterr().out == served
+    assert served.splitlines()[1] == "2023/07/30,1:00:00,$100.00,$100.00,Task 1"
+
+
+def test_daemon_reports_errors(server, capsys):
+    log_path = server.ledger.log_path
+    with open(log_path, "w", encoding="utf8") as file:
+        file.write("o 2023/07/30 09:00:00 AM\n")
+
+    with pytest.raises(SystemExit):
+        main(["-f", log_path, "reg"])
+    assert "Expected CheckIn directive" in capsys.readouterr().err
+
+
+def test_client_falls_back_on_truncated_response(tmp_path, capsys):
+    log_path = str(tmp_path / "ledger.dat")
+    main(["-f", log_path, "backfill", "Account1", "Task 1", "2023/07/30 09:00", "1h"])
+    capsys.readouterr()
+
+    # A daemon that dies partway through its response
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(client.socket_path(log_path))
+    listener.listen()
+
+    def respond() -> None:
+        connection, _ = listener.accept()
+        with connection:
+            connection.makefile("rb").readline()
+            connection.sendall(b'{"output": "partial')
+
+    thread = threading.Thread(target=respond)
+    thread.start()
+    try:
+        main(["-f", log_path, "csv", "100"])
+    finally:
+        thread.join()
+        listener.close()
+
+    out = capsys.readouterr().out
+    assert "partial" not in out
+    assert out.splitlines()[1] == "2023/07/30,1:00:00,$100.00,$100.00,Task 1"
@@ -0,0 +1,69 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import timcol
+
+HEAVY_MODULES = {"dateparser", "tabulate", "pystache"}
+
+
+def _imported_modules(tmp_path, args: list[str]) -> set[str]:
+    """Runs timcol with `-X importtime` and returns every module it imported."""
+    env = {k: v for k, v in os.environ.items() if k != "TIMCOL_HOME"}
+    env["PYTHONPATH"] = os.path.dirname(os.path.dirname(timcol.__file__))
+    env["XDG_CACHE_HOME"] = str(tmp_path / "cache")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "timcol", *args],
+        cwd=tmp_path,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    modules = set()
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            name = line.rsplit("|", 1)[1].strip()
+            modules.add(name.split(".")[0])
+
+    return modules
+
+
+@pytest.mark.parametrize(
+    "args",
+    [
+        ["log-path"],
+        ["start", "Account", "Task"],
+        ["swap", "Account", "Task 2"],
+        ["stop"],
+        ["resume"],
+        ["cancel"],
+    ],
+)
+def test_light_commands_skip_heavy_imports(tmp_path, args: list[str]):
+    assert not _imported_modules(tmp_path, args) & HEAVY_MODULES
+
+
+@pytest.mark.parametrize(
+    "args, expected",
+    [
+        (["reg"], {"tabulate"}),
+        (["summary"], {"tabulate"}),
+        (["csv", "100"], set()),
+        (["json"], set()),
+        (["html", "100"], {"pystache"}),
+        (["backfill", "Account", "Task", "2023/07/30 09:00:00", "1h"], {"dateparser"}),
+    ],
+)
+def test_commands_import_only_what_they_need(
+    tmp_path, args: list[str], expected: set[str]
+):
+    assert _imported_modules(tmp_path, args) & HEAVY_MODULES == expected
+
+
+def test_html_reuses_compiled_template(tmp_path):
+    _imported_modules(tmp_path, ["html", "100"])
+    assert not _imported_modules(tmp_path, ["html", "100"]) & HEAVY_MODULES
@@ -0,0 +1,51 @@
+import concurrent.futures
+import io
+
+from timcol.logfile import parse_file
+from timcol.tool.args import ParsedArgs
+from timcol.tool.views import invoices
+
+
+def _ledger() -> str:
+    lines = []
+    for day in range(1, 29):
+        for account in ["Account1", "Account/2", "Account 2", "Account3"]:
+            lines.append(f"i 2023/07/{day:02} 09:00:00 AM {account}  Task {day}")
+            if day % 5 == 0:
+                lines.append("    ; Rate: 150")
+            lines.append(f"o 2023/07/{day:02} 10:30:00 AM")
+    return "\n".join(lines) + "\n"
+
+
+def _render(tmp_path, capsys, name: str, jobs: int) -> dict[str, bytes]:
+    output_dir = tmp_path / name
+    args = ParsedArgs.InvoicesArgs(
+        100, True, {"Account3": 200}, "week", ["html", "csv"], str(output_dir), jobs
+    )
+    invoices.render(parse_file(io.StringIO(_ledger())), args)
+    written = capsys.readouterr().out.splitlines()
+    assert len(written) == 4 * 5 * 2
+    return {
+        str(i.relative_to(output_dir)): i.read_bytes()
+        for i in sorted(output_dir.rglob("*"))
+        if i.is_file()
+    }
+
+
+def test_invoices_pool_matches_serial(tmp_path, capsys, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    pools = []
+
+    class _Pool(concurrent.futures.ProcessPoolExecutor):
+        def __init__(self, *args, **kwargs):
+            pools.append(self)
+            super().__init__(*args, **kwargs)
+
+    monkeypatch.setattr(concurrent.futures, "ProcessPoolExecutor", _Pool)
+
+    serial = _render(tmp_path, capsys, "serial", 1)
+    assert not pools
+    pooled = _render(tmp_path, capsys, "pooled", 3)
+    assert len(pools) == 1
+    assert len(serial) == 4 * 5 * 2
+    assert pooled == serial
@@ -1,6 +1,23 @@
 import datetime
 import io
-from timcol.logfile import directive, parse_file, LogFile
+import pathlib
+import pickle
+from unittest import mock
+
+import pytest
+
+from timcol.logfile import (
+    LogFile,
+    cache,
+    chunked,
+    directive,
+    follow,
+    mapped,
+    parse_file,
+    shards,
+    tail,
+    timerange,
+)
 
 
 def test_checkin_parse():
@@ -81,3 +98,482 @@ i 2023/07/30 02:00:00 PM TestAccount  Pending task
         task="Pending task",
     )
     assert parsed_log.pending == expected_pending
+
+
+TAIL_LEDGERS = [
+    "",
+    "\n\n",
+    "i 2023/07/30 10:00:00 AM TestAccount  Pending task\n",
+    """i 2023/07/30 10:00:00 AM TestAccount  Test task 1
+    ; metadata1: value1
+o 2023/07/30 11:00:00 AM
+    ; metadata2: value2
+
+""",
+    """i 2023/07/30 10:00:00 AM TestAccount  Test task 1
+o 2023/07/30 11:00:00 AM
+; A comment
+i 2023/07/30 12:00:00 PM OtherAccount  Test task 2
+    ; Multiplier: 2
+    ; Rate: 100
+    ; Multiplier: 3
+o 2023/07/30 01:00:00 PM
+i 2023/07/30 02:00:00 PM TestAccount  Pending täsk
+    ; metadata: välue""",
+]
+
+
+@pytest.mark.parametrize("log_content", TAIL_LEDGERS)
+@pytest.mark.parametrize("block_size", [1, 7, tail.BLOCK_SIZE])
+def test_tail_matches_parse_file(log_content: str, block_size: int):
+    parsed_log = parse_file(io.StringIO(log_content))
+
+    file = io.BytesIO(log_content.encode("utf8"))
+    assert tail.find_pending(file, block_size) == parsed_log.pending
+
+    last_entry = tail.find_last_entry(file, block_size)
+    if parsed_log.entries:
+        assert last_entry is not None
+        assert last_entry.check_in == parsed_log.entries[-1].check_in
+        assert last_entry.check_out == parsed_log.entries[-1].check_out
+    else:
+        assert last_entry is None
+
+
+def _entry_directives(log: LogFile):
+    return [(i.check_in, i.check_out) for i in log.entries], log.pending
+
+
+def test_cached_parse_resumes_after_append(tmp_path):
+    log_path = tmp_path / "ledger.dat"
+    log_content = TAIL_LEDGERS[-1]
+    log_path.write_text(log_content, encoding="utf8")
+
+    parsed_log = cache.parse_path(str(log_path))
+    assert _entry_directives(parsed_log) == _entry_directives(
+        parse_file(io.StringIO(log_content))
+    )
+
+    # Entries are cached up to the last completed one, never the pending check in
+    encoded = log_content.encode("utf8")
+    cached = cache._load(str(log_path))
+    assert cached is not None
+    assert cached.offset == encoded.rindex(b"\ni ", 0, encoded.rindex(b"\ni ")) + 1
+    assert len(cached.rows) == 1
+
+    log_content += "\no 2023/07/30 03:00:00 PM\n    ; Multiplier: 2\n"
+    log_path.write_text(log_content, encoding="utf8")
+    parsed_log = cache.parse_path(str(log_path))
+    assert _entry_directives(parsed_log) == _entry_directives(
+        parse_file(io.StringIO(log_content))
+    )
+    assert parsed_log.entries[-1].metadata["Multiplier"] == "2"
+
+    cached = cache._load(str(log_path))
+    assert cached is not None
+    assert len(cached.rows) == 2
+
+
+def test_cached_parse_invalidated_by_rewrite(tmp_path):
+    log_path = tmp_path / "ledger.dat"
+    log_path.write_text(TAIL_LEDGERS[-1], encoding="utf8")
+    cache.parse_path(str(log_path))
+
+    log_content = TAIL_LEDGERS[-1].replace("Test task 1", "Renamed")
+    log_path.write_text(log_content, encoding="utf8")
+    parsed_log = cache.parse_path(str(log_path))
+    assert parsed_log.entries[0].task == "Renamed"
+    assert _entry_directives(parsed_log) == _entry_directives(
+        parse_file(io.StringIO(log_content))
+    )
+
+    log_path.write_text("", encoding="utf8")
+    assert _entry_directives(cache.parse_path(str(log_path))) == ([], None)
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "2023/07/30 10:00:00 AM",
+        "2023/07/30 12:00:00 AM",
+        "2023/07/30 12:59:59 AM",
+        "2023/07/30 12:00:00 PM",
+        "2023/07/30 01:00:00 PM",
+        "2023/07/30 11:59:59 PM",
+        "2024/02/29 06:30:15 PM",
+        # Irregular but accepted by strptime
+        "2023/7/30 1:02:03 PM",
+        "2023/07/ 3 10:00:00 am",
+    ],
+)
+def test_parse_timestamp_matches_strptime(text: str):
+    assert directive.parse_timestamp(text) == datetime.datetime.strptime(
+        text, directive.TIME_FORMAT
+    )
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "2023/07/30 00:00:00 AM",
+        "2023/07/30 13:00:00 PM",
+        "2023/02/30 10:00:00 AM",
+        "2023/13/01 10:00:00 AM",
+        "2023/07/30 10:60:00 AM",
+        "2023/+7/30 10:00:00 AM",
+        "2023-07-30 10:00:00 AM",
+    ],
+)
+def test_parse_timestamp_rejects_invalid(text: str):
+    with pytest.raises(ValueError):
+        datetime.datetime.strptime(text, directive.TIME_FORMAT)
+    with pytest.raises(ValueError):
+        directive.parse_timestamp(text)
+
+
+def test_parse_line():
+    assert directive.parse_line(
+        "i 2023/07/30 10:00:00 AM TestAccount  Test task\n"
+    ) == directive.CheckIn(
+        timestamp=datetime.datetime(2023, 7, 30, 10, 0, 0),
+        account="TestAccount",
+        task="Test task",
+    )
+    assert directive.parse_line("o 2023/07/30 11:00:00 AM\n") == directive.CheckOut(
+        timestamp=datetime.datetime(2023, 7, 30, 11, 0, 0)
+    )
+    assert directive.parse_line("    ; Rate: 100 \n") == directive.Metadata(
+        "Rate", "100"
+    )
+
+    for line in ["", "\n", "; comment\n", "include other.dat\n", "   ; x: y\n"]:
+        assert directive.parse_line(line) is None
+
+
+def test_parse_file_with_check_in_filter():
+    log_content = """i 2023/07/30 10:00:00 AM Account1  Writing report
+    ; Rate: 200
+o 2023/07/30 11:00:00 AM
+    ; Multiplier: 2
+i 2023/07/30 12:00:00 PM Account2  Writing code
+    ; Rate: 100
+o 2023/07/30 01:00:00 PM
+i 2023/07/30 02:00:00 PM Account1  Writing code
+"""
+    log = parse_file(io.StringIO(log_content))
+    entries, pending = _entry_directives(log)
+
+    assert _entry_directives(
+        parse_file(
+            io.StringIO(log_content), directive.CheckInFilter(account="Account1")
+        )
+    ) == (entries[:1], pending)
+    assert _entry_directives(
+        parse_file(io.StringIO(log_content), directive.CheckInFilter(task="code"))
+    ) == (entries[1:], pending)
+    assert _entry_directives(
+        parse_file(io.StringIO(log_content), directive.CheckInFilter("Account2"))
+    ) == (entries[1:], None)
+
+
+def test_directives_share_empty_metadata():
+    log_content = """i 2023/07/30 10:00:00 AM TestAccount  Test task 1
+    ; Multiplier: 2
+o 2023/07/30 11:00:00 AM
+    ; Multiplier: 3
+    ; Rate: 100
+i 2023/07/30 12:00:00 PM TestAccount  Test task 2
+o 2023/07/30 01:00:00 PM
+"""
+    parsed_log = parse_file(io.StringIO(log_content))
+    first, second = parsed_log.entries
+
+    assert first.metadata == {"Multiplier": "2", "Rate": "100"}
+    assert first.metadata is first.metadata
+    assert second.check_in.metadata is directive.EMPTY_METADATA
+    assert second.check_out.metadata is directive.EMPTY_METADATA
+    assert second.metadata == {}
+    assert not hasattr(second.check_in, "__dict__")
+
+    restored = pickle.loads(pickle.dumps(parsed_log.entries))
+    assert restored[0].check_in == first.check_in
+    assert restored[1].check_in.metadata is directive.EMPTY_METADATA
+
+
+def test_directives_share_repeated_strings():
+    long_note = "A note much too long to be worth interning"
+    log_content = f"""i 2023/07/30 10:00:00 AM TestAccount  Test task 1
+    ; Multiplier: 2
+    ; Rate: 100
+o 2023/07/30 11:00:00 AM
+i 2023/07/30 12:00:00 PM TestAccount  Test task 2
+    ; Multiplier: 2
+    ; Rate: 100
+o 2023/07/30 01:00:00 PM
+    ; Note: {long_note}
+i 2023/07/30 02:00:00 PM TestAccount  Test task 3
+    ; Multiplier: 2
+o 2023/07/30 03:00:00 PM
+    ; Note: {long_note}
+"""
+    for parsed_log in (
+        parse_file(io.StringIO(log_content)),
+        mapped.parse_buffer(log_content.encode("utf8")),
+    ):
+        first, second, third = parsed_log.entries
+        assert first.account is second.account is third.account
+        assert first.check_in.metadata == {"Multiplier": "2", "Rate": "100"}
+        assert first.check_in.metadata is second.check_in.metadata
+        assert third.check_in.metadata == {"Multiplier": "2"}
+
+        assert second.check_out.metadata == third.check_out.metadata
+        assert second.check_out.metadata is not third.check_out.metadata
+
+
+@pytest.mark.parametrize("log_content", TAIL_LEDGERS)
+@pytest.mark.parametrize("newline", ["\n", "\r\n"])
+def test_parse_buffer_matches_parse_file(log_content: str, newline: str):
+    raw = log_content.replace("\n", newline).encode("utf8")
+    parsed_log = parse_file(io.TextIOWrapper(io.BytesIO(raw), encoding="utf8"))
+
+    assert _entry_directives(mapped.parse_buffer(raw)) == _entry_directives(parsed_log)
+
+
+def test_cached_parse_uses_mmap_above_threshold(tmp_path, monkeypatch):
+    monkeypatch.setattr(mapped, "MMAP_THRESHOLD", 1)
+    parse_mapped = mock.Mock(wraps=mapped.parse_mapped)
+    monkeypatch.setattr(mapped, "parse_mapped", parse_mapped)
+
+    log_path = tmp_path / "ledger.dat"
+    log_content = TAIL_LEDGERS[-1]
+    log_path.write_text(log_content, encoding="utf8")
+
+    assert _entry_directives(cache.parse_path(str(log_path))) == _entry_directives(
+        parse_file(io.StringIO(log_content))
+    )
+    parse_mapped.assert_called_once()
+
+
+def test_find_boundaries():
+    raw = (
+        "i 2023/07/01 09:00:00 AM Account1  Task 1\n"
+        "    ; Multiplier: 2\n"
+        "i not a check in\n"
+        "o 2023/07/01 10:00:00 AM\n"
+        "i 2023/07/02 09:00:00 AM Account1  Task 2\n"
+        "o 2023/07/02 10:00:00 AM\n"
+    ).encode("utf8")
+    second = raw.index(b"i 2023/07/02")
+
+    assert chunked.find_boundaries(raw, 0, len(raw), 4) == [0, second, len(raw)]
+    assert chunked.find_boundaries(raw, second, len(raw), 4) == [second, len(raw)]
+
+
+@pytest.mark.parametrize("count", [1, 2, 7, 100])
+def test_parse_parallel_matches_parse_buffer(tmp_path, monkeypatch, count: int):
+    monkeypatch.setattr(chunked, "CHUNKS_PER_WORKER", count)
+    log_path = tmp_path / "ledger.dat"
+    log_content = TAIL_LEDGERS[-1] + _daily_ledger(1, 31)
+    log_path.write_text(log_content, encoding="utf8")
+    raw = log_content.encode("utf8")
+
+    for start in (0, raw.index(b"i 2023/07/15")):
+        parsed_log = chunked.parse_parallel(str(log_path), start, len(raw), 2)
+        assert _entry_directives(parsed_log) == _entry_directives(
+            mapped.parse_buffer(raw, start)
+        )
+
+    log_path.write_text(
+        _daily_ledger(1, 15) + TAIL_LEDGERS[2] + _daily_ledger(16, 31),
+        encoding="utf8",
+    )
+    with pytest.raises(AssertionError, match="Expected CheckOut directive"):
+        chunked.parse_parallel(str(log_path), 0, log_path.stat().st_size, 2)
+
+
+def test_cached_parse_in_parallel_above_threshold(tmp_path, monkeypatch):
+    monkeypatch.setattr(chunked, "PARALLEL_THRESHOLD", 1)
+    monkeypatch.setattr(chunked.os, "cpu_count", lambda: 2)
+    parse_parallel = mock.Mock(wraps=chunked.parse_parallel)
+    monkeypatch.setattr(chunked, "parse_parallel", parse_parallel)
+
+    log_path = tmp_path / "ledger.dat"
+    log_content = _daily_ledger(1, 31)
+    log_path.write_text(log_content, encoding="utf8")
+
+    assert _entry_directives(cache.parse_path(str(log_path))) == _entry_directives(
+        parse_file(io.StringIO(log_content))
+    )
+    parse_parallel.assert_called_once()
+
+
+def _daily_ledger(first_day: int, last_day: int) -> str:
+    lines = []
+    for day in range(first_day, last_day + 1):
+        lines.append(f"i 2023/07/{day:02} 09:00:00 AM Account{day % 3}  Task {day}")
+        if day % 4 == 0:
+            lines.append("    ; Multiplier: 2")
+        lines.append(f"o 2023/07/{day:02} 10:30:00 AM")
+        lines.append("")
+    return "\n".join(lines)
+
+
+@pytest.mark.parametrize("day", [1, 2, 15, 30, 31])
+def test_find_check_in_offset(day: int):
+    log_content = _daily_ledger(1, 30)
+    raw = log_content.encode("utf8")
+    when = datetime.datetime(2023, 7, day, 9, 0, 0)
+
+    expected = raw.find(f"i 2023/07/{day:02}".encode())
+    if expected == -1:
+        expected = len(raw)
+    assert timerange.find_check_in_offset(io.BytesIO(raw), when) == expected
+
+
+def test_parse_range():
+    log_content = (
+        _daily_ledger(1, 14)
+        # Backfilled after later entries
+        + "i 2023/07/09 01:00:00 PM Account1  Backfilled\no 2023/07/09 02:00:00 PM\n"
+        + _daily_ledger(15, 30)
+        + "i 2023/07/30 11:00:00 AM Account1  Pending\n"
+    )
+    since = datetime.datetime(2023, 7, 8)
+    until = datetime.datetime(2023, 7, 12)
+
+    parsed_log = parse_file(io.StringIO(log_content))
+    expected = [
+        (i.check_in, i.check_out)
+        for i in parsed_log.entries
+        if since <= i.check_in.timestamp < until
+    ]
+
+    ranged_log = timerange.parse_range(
+        io.BytesIO(log_content.encode("utf8")), since, until
+    )
+    assert _entry_directives(ranged_log) == (expected, None)
+    assert [i.task for i in ranged_log.entries][-1] == "Backfilled"
+
+    ranged_log = timerange.parse_range(
+        io.BytesIO(log_content.encode("utf8")), datetime.datetime(2023, 7, 30), None
+    )
+    assert [i.task for i in ranged_log.entries] == ["Task 30"]
+    assert ranged_log.pending == parsed_log.pending
+
+
+def _write_shards(tmp_path) -> str:
+    (tmp_path / "2023").mkdir()
+    (tmp_path / "2023" / "07.dat").write_text(_daily_ledger(1, 15), encoding="utf8")
+    (tmp_path / "2023" / "08.dat").write_text(
+        _daily_ledger(1, 15).replace("2023/07/", "2023/08/"), encoding="utf8"
+    )
+    (tmp_path / "archive.dat").write_text(_daily_ledger(16, 31), encoding="utf8")
+
+    log_path = tmp_path / "ledger.dat"
+    log_path.write_text(
+        "; Shards\ninclude archive.dat\ninclude 2023/*.dat\ninclude 2024.dat\n",
+        encoding="utf8",
+    )
+    return str(log_path)
+
+
+def test_find_shards(tmp_path):
+    log_path = _write_shards(tmp_path)
+    expected = [
+        log_path,
+        str(tmp_path / "archive.dat"),
+        str(tmp_path / "2023" / "07.dat"),
+        str(tmp_path / "2023" / "08.dat"),
+        str(tmp_path / "2024.dat"),
+    ]
+
+    assert shards.find_shards(log_path) == expected
+    assert shards.find_shards(str(tmp_path / "2023" / "*.dat")) == expected[2:4]
+
+    # Only includes before the first directive count
+    with open(log_path, "a", encoding="utf8") as file:
+        file.write(_daily_ledger(1, 1) + "include 2025.dat\n")
+    assert shards.find_shards(log_path) == expected
+    # New directives go to the newest shard, even before it exists
+    assert shards.write_path(log_path) == expected[-1]
+
+
+def test_find_shards_skips_sidecars(tmp_path):
+    log_path = _write_shards(tmp_path)
+    shard_glob = str(tmp_path / "2023" / "*")
+    expected = shards.find_shards(shard_glob)
+    for path in expected:
+        cache.parse_path(path)
+        pathlib.Path(f"{path}.cache.tmp").write_bytes(b"\x80")
+        pathlib.Path(f"{path}.sock").write_bytes(b"")
+    (tmp_path / "2023" / "upload.stamp").write_bytes(b"\x80")
+
+    assert shards.find_shards(shard_glob) == expected
+    assert shards.write_path(shard_glob) == expected[-1]
+    assert len(shards.parse_shards(expected).entries) == 30
+
+    # Includes are globbed the same way
+    assert shards.find_shards(log_path)[2:4] == expected
+
+    with pytest.raises(shards.ShardError, match="2025"):
+        shards.write_path(str(tmp_path / "2025" / "*.dat"))
+
+
+@pytest.mark.parametrize("threshold", [chunked.PARALLEL_THRESHOLD, 0])
+def test_parse_shards(tmp_path, monkeypatch, threshold: int):
+    monkeypatch.setattr(chunked, "PARALLEL_THRESHOLD", threshold)
+    monkeypatch.setattr(shards.os, "cpu_count", lambda: 4)
+    log_path = _write_shards(tmp_path)
+    paths = shards.find_shards(log_path)
+
+    shards._build_stale_caches(paths)
+    assert all(cache.is_current(i) for i in paths[1:-1]) == (threshold == 0)
+
+    merged_log = shards.parse_shards(paths)
+    timestamps = [i.check_in.timestamp for i in merged_log.entries]
+    assert len(timestamps) == 46
+    assert timestamps == sorted(timestamps)
+    assert merged_log.pending is None
+
+    with open(tmp_path / "archive.dat", "a", encoding="utf8") as file:
+        file.write("i 2023/07/31 11:00:00 AM Account1  Pending\n")
+    with pytest.raises(ValueError, match="archive.dat"):
+        shards.parse_shards(shards.find_shards(log_path))
+    with pytest.raises(ValueError, match="archive.dat"):
+        shards.write_path(log_path)
+
+
+def test_follower_parses_appended_lines(tmp_path):
+    log_path = tmp_path / "ledger.dat"
+    follower = follow.Follower(str(log_path))
+    with pytest.raises(FileNotFoundError):
+        follower.refresh()
+
+    def check(log_content: str) -> None:
+        log_path.write_text(log_content, encoding="utf8")
+        assert _entry_directives(follower.refresh()) == _entry_directives(
+            parse_file(io.StringIO(log_content))
+        )
+
+    log_content = _daily_ledger(1, 10)
+    check(log_content)
+    assert follower.refresh() is follower.log
+
+    # Appending metadata to the last entry, then more entries
+    log_content += "    ; Rate: 200\n"
+    check(log_content)
+    log_content += "i 2023/07/11 09:00:00 AM Account1  Pending\n"
+    check(log_content)
+    log_content += "o 2023/07/11 10:00:00 AM\n" + _daily_ledger(12, 20)
+    check(log_content)
+
+    # Shrinking or rewriting the ledger reparses it
+    check(_daily_ledger(1, 15))
+    check(_daily_ledger(2, 25).replace("Task", "Rewritten"))
+
+    # So does editing an earlier entry without changing the ledger's size
+    log_content = _daily_ledger(2, 25)
+    check(log_content)
+    edited = log_content.replace("Account0  Task 3", "Account0  Edit 3")
+    assert len(edited) == len(log_content) and edited != log_content
+    check(edited)
@@ -0,0 +1,62 @@
+import concurrent.futures
+import contextlib
+import datetime
+import io
+from typing import Callable
+
+from timcol.logfile import LogFile, parse_file
+from timcol.tool import mutators
+from timcol.tool.args import ParsedArgs
+
+WORKERS = 8
+ITERATIONS = 25
+
+
+def _track(log_path: str, worker: int) -> None:
+    start_args = ParsedArgs.StartArgs(f"Account{worker}", "Stress test")
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i in range(ITERATIONS):
+            match i % 5:
+                case 0:
+                    mutators.start(log_path, start_args)
+                case 1:
+                    mutators.swap(log_path, start_args)
+                case 2:
+                    mutators.cancel(log_path)
+                case 3:
+                    mutators.resume(log_path)
+                case _:
+                    mutators.stop(log_path)
+
+
+def _backfill(log_path: str, worker: int) -> None:
+    backfill_args = ParsedArgs.BackfillArgs(
+        f"Account{worker}",
+        "Backfilled",
+        datetime.datetime(2023, 7, 30, 9, 0, 0),
+        datetime.timedelta(minutes=30),
+    )
+    for _ in range(ITERATIONS):
+        mutators.backfill(log_path, backfill_args)
+
+
+def _run_workers(log_path: str, worker: Callable[[str, int], None]) -> LogFile:
+    with concurrent.futures.ProcessPoolExecutor(WORKERS) as executor:
+        futures = [executor.submit(worker, log_path, i) for i in range(WORKERS)]
+        for future in futures:
+            future.result()
+
+    # Parsing asserts that check ins and check outs alternate
+    with open(log_path, encoding="utf8") as file:
+        return parse_file(file)
+
+
+def test_parallel_tracking_keeps_ledger_well_formed(tmp_path):
+    log = _run_workers(str(tmp_path / "ledger.dat"), _track)
+    assert log.entries
+
+
+def test_parallel_backfills_keep_ledger_well_formed(tmp_path):
+    log = _run_workers(str(tmp_path / "ledger.dat"), _backfill)
+    assert len(log.entries) == WORKERS * ITERATIONS
+    assert log.pending is None
@@ -1,13 +1,23 @@
+import builtins
+import contextlib
 from datetime import datetime, timedelta
+import json
+import mmap
 import os
 from pathlib import Path
 from unittest import mock
 from zoneinfo import ZoneInfo
 from pyfakefs.fake_filesystem_unittest import Patcher
+import pystache
 import pytest
+from tabulate import tabulate
 import time_machine
 
+from timcol.logfile import columns, follow
+from timcol.tool.args import ParsedArgs
 from timcol.tool.main import main
+from timcol.tool.views import html, register
+from timcol.tool.views import json as json_view
 
 test_tz_name = "America/Los_Angeles"
 test_tz = ZoneInfo(test_tz_name)
@@ -25,7 +35,7 @@ def mock_fs():
         assert fs
         fs.create_dir("/timcol-home")
 
-        yield
+        yield fs
 
 
 @pytest.fixture()
@@ -85,3 +95,644 @@ i 2023/07/30 10:30:00 AM Account2  Task 2
 o 2023/07/30 11:15:00 AM
 """
     assert ledger_contents == expected_contents
+
+
+def test_resume(mock_time):
+    main(["backfill", "Account1", "Task 1", "2023/07/30 09:00:00", "1h"])
+    main(["resume"])
+    main(["resume"])
+
+    with ledger_path.open("r") as f:
+        ledger_contents = f.read()
+
+    expected_contents = """i 2023/07/30 09:00:00 AM Account1  Task 1
+o 2023/07/30 10:00:00 AM
+i 2023/07/30 10:01:12 AM Account1  Task 1
+"""
+    assert ledger_contents == expected_contents
+
+
+class _CountingFile:
+    """Wraps a binary file and counts how many bytes are read from it."""
+
+    def __init__(self, file):
+        self.file = file
+        self.bytes_read = 0
+
+    def read(self, size=-1):
+        data = self.file.read(size)
+        self.bytes_read += len(data)
+        return data
+
+    def readline(self, size=-1):
+        line = self.file.readline(size)
+        self.bytes_read += len(line)
+        return line
+
+    def __iter__(self):
+        return iter(self.readline, self.file.read(0))
+
+    def __getattr__(self, name):
+        return getattr(self.file, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.file.close()
+
+
+@contextlib.contextmanager
+def _counting_reads():
+    """Counts the bytes read from each file opened or mapped while active."""
+    opened: list[_CountingFile] = []
+    real_open = builtins.open
+    real_mmap = mmap.mmap
+
+    def counting_open(*args, **kwargs):
+        opened.append(_CountingFile(real_open(*args, **kwargs)))
+        return opened[-1]
+
+    def counting_mmap(fileno, length, *args, **kwargs):
+        buffer = real_mmap(fileno, length, *args, **kwargs)
+        opened.append(_CountingFile(None))
+        # Anything mapped counts as read in full
+        opened[-1].bytes_read = len(buffer)
+        return buffer
+
+    with mock.patch("builtins.open", counting_open), mock.patch(
+        "mmap.mmap", counting_mmap
+    ):
+        yield opened
+
+
+def test_cancel_then_append_metadata(mock_time, capsys):
+    main(["backfill", "Account1", "Task 1", "2023/07/29 09:00:00", "1h"])
+    main(["start", "Account1", "Task 2"])
+    # Caches the ledger while the task is pending
+    main(["reg"])
+    main(["cancel"])
+    with ledger_path.open("a") as f:
+        f.write("    ; Multiplier: 2\n")
+    capsys.readouterr()
+
+    main(["reg"])
+    assert capsys.readouterr().out.splitlines()[-1] == "TOTAL TIME         2:00:00"
+
+
+def test_cancel_large_ledger(mock_time, capsys):
+    history = "".join(
+        f"i 2023/07/29 09:00:00 AM Account{i % 5}  Task {i}\n"
+        "o 2023/07/29 10:00:00 AM\n"
+        for i in range(50_000)
+    )
+    ledger_path.write_text(history)
+    main(["start", "Account1", "Pending task"])
+    with ledger_path.open("a") as f:
+        f.write("\n\n")
+
+    with _counting_reads() as opened:
+        main(["cancel"])
+
+    assert capsys.readouterr().out == (
+        "-i 2023/07/30 10:01:12 AM Account1  Pending task\n"
+    )
+    assert ledger_path.read_text() == history
+    # Only the tail of the multi-megabyte ledger was read
+    assert sum(i.bytes_read for i in opened) < 4 * 8192
+
+    main(["cancel"])
+    assert capsys.readouterr().out == "No task to cancel.\n"
+    assert ledger_path.read_text() == history
+
+
+def test_csv_stream(mock_time, capsys):
+    ledger_path.write_text(
+        """i 2023/07/30 09:00:00 AM Account1  Task 1
+    ; Multiplier: 1.5
+o 2023/07/30 10:00:00 AM
+i 2023/07/30 10:30:00 AM Account2  Task 2
+    ; Rate: 200
+o 2023/07/30 11:15:00 AM
+i 2023/07/30 11:30:00 AM Account2  Pending task
+"""
+    )
+
+    main(["csv", "100", "--allow-rate-override"])
+    parsed = capsys.readouterr().out
+
+    main(["csv", "100", "--allow-rate-override", "--stream"])
+    streamed = capsys.readouterr().out
+
+    assert streamed == parsed
+    assert streamed.splitlines() == [
+        "Date,Duration,Rate,Cost,Description",
+        "2023/07/30,1:00:00,$150.00,$150.00,Task 1",
+        "2023/07/30,0:45:00,$200.00,$150.00,Task 2",
+        ",,,$300.00,TOTAL COST",
+    ]
+
+
+@pytest.mark.parametrize("stream", [[], ["--stream"]])
+def test_csv_date_range(mock_time, capsys, stream):
+    ledger_path.write_text(
+        """i 2023/06/30 09:00:00 AM Account1  June task
+o 2023/06/30 10:00:00 AM
+i 2023/07/01 09:00:00 AM Account1  July task
+o 2023/07/01 10:00:00 AM
+i 2023/08/01 09:00:00 AM Account1  August task
+o 2023/08/01 10:00:00 AM
+"""
+    )
+
+    main(["csv", "100", "--since", "2023/07/01", "--until", "2023/08/01", *stream])
+    assert capsys.readouterr().out.splitlines() == [
+        "Date,Duration,Rate,Cost,Description",
+        "2023/07/01,1:00:00,$100.00,$100.00,July task",
+        ",,,$100.00,TOTAL COST",
+    ]
+
+
+@pytest.mark.parametrize("stream", [[], ["--stream"]])
+def test_csv_account_filter(mock_time, capsys, stream):
+    ledger_path.write_text(
+        """i 2023/07/30 09:00:00 AM Account1  Writing report
+    ; Rate: 200
+o 2023/07/30 10:00:00 AM
+i 2023/07/30 10:30:00 AM Account2  Writing code
+o 2023/07/30 11:15:00 AM
+i 2023/07/30 11:30:00 AM Account1  Reviewing report
+o 2023/07/30 12:00:00 PM
+"""
+    )
+
+    main(["csv", "100", "--account", "Account1", "--task", "report", *stream])
+    assert capsys.readouterr().out.splitlines() == [
+        "Date,Duration,Rate,Cost,Description",
+        "2023/07/30,1:00:00,$100.00,$100.00,Writing report",
+        "2023/07/30,0:30:00,$100.00,$50.00,Reviewing report",
+        ",,,$150.00,TOTAL COST",
+    ]
+
+
+@pytest.mark.parametrize("use_numpy", [True, False])
+def test_summary(mock_time, capsys, monkeypatch, use_numpy):
+    if not use_numpy:
+        monkeypatch.setattr(columns, "numpy", None)
+    ledger_path.write_text(
+        """i 2023/07/24 09:00:00 AM Account1  Task 1
+    ; Multiplier: 1.5
+o 2023/07/24 10:00:00 AM
+i 2023/07/28 10:30:00 AM Account2  Task 2
+o 2023/07/28 11:15:00 AM
+i 2023/07/30 09:00:00 AM Account1  Task 3
+o 2023/07/30 09:30:00 AM
+i 2023/07/30 10:00:00 AM Account2  Pending task
+"""
+    )
+
+    main(["summary"])
+    assert capsys.readouterr().out.splitlines() == [
+        "account      entries  duration",
+        "---------  ---------  ----------",
+        "Account1           2  2:00:00",
+        "Account2           2  0:46:12",
+        "TOTAL              4  2:46:12",
+    ]
+
+    main(["summary", "--by", "day", "--unscaled"])
+    assert capsys.readouterr().out.splitlines() == [
+        "day           entries  duration",
+        "----------  ---------  ----------",
+        "2023/07/24          1  1:00:00",
+        "2023/07/28          1  0:45:00",
+        "2023/07/30          2  0:31:12",
+        "TOTAL               4  2:16:12",
+    ]
+
+    main(["summary", "--by", "Multiplier", "--account", "Account1"])
+    assert capsys.readouterr().out.splitlines() == [
+        "Multiplier      entries  duration",
+        "------------  ---------  ----------",
+        "(none)                1  0:30:00",
+        "1.5                   1  1:30:00",
+        "TOTAL                 2  2:00:00",
+    ]
+
+
+def test_html_matches_pystache(mock_time, capsys, mock_fs):
+    mock_fs.add_real_directory(os.path.dirname(html.__file__))
+    html._load_template.cache_clear()
+    ledger_path.write_text(
+        """i 2023/07/30 09:00:00 AM Account1  Fix <b> & "quotes" {in} 'reports'
+    ; Multiplier: 1.5
+o 2023/07/30 10:00:00 AM
+i 2023/07/30 10:30:00 AM Account2  Task 2
+o 2023/07/30 11:15:00 AM
+i 2023/07/30 11:30:00 AM Account2  Task 3
+o 2023/07/30 11:45:00 AM
+"""
+    )
+
+    with mock.patch.object(html, "CHUNK_ROWS", 2):
+        main(["html", "100"])
+    rendered = capsys.readouterr().out
+
+    template = (Path(html.__file__).parent / html.TEMPLATE_NAME).read_text()
+    task = {"date": "2023/07/30", "hourly_rate": "$100.00"}
+    expected = pystache.render(
+        template,
+        {
+            "date": "2023/07/30",
+            "cost": "$250.00",
+            "duration": "2:00:00",
+            "tasks": [
+                {
+                    **task,
+                    "duration": "1:00:00",
+                    "hourly_rate": "$150.00",
+                    "cost": "$150.00",
+                    "description": """Fix <b> & "quotes" {in} 'reports'""",
+                },
+                {
+                    **task,
+                    "duration": "0:45:00",
+                    "cost": "$75.00",
+                    "description": "Task 2",
+                },
+                {
+                    **task,
+                    "duration": "0:15:00",
+                    "cost": "$25.00",
+                    "description": "Task 3",
+                },
+            ],
+        },
+    )
+    assert rendered == expected
+
+    # The compiled template is reused by later runs
+    html._load_template.cache_clear()
+    with mock.patch.object(html, "_compile") as compile:
+        main(["html", "100"])
+    assert not compile.called
+    assert capsys.readouterr().out == expected
+
+
+def test_sharded_ledger(mock_time, capsys):
+    ledger_path.write_text("include ledger-*.dat\n")
+    (timcol_home / "ledger-2022.dat").write_text(
+        """i 2022/12/30 09:00:00 AM Account1  Old task
+o 2022/12/30 10:00:00 AM
+"""
+    )
+    (timcol_home / "ledger-2023.dat").write_text(
+        """i 2023/01/02 09:00:00 AM Account1  New task
+o 2023/01/02 09:30:00 AM
+"""
+    )
+
+    main(["start", "Account1", "Current task"])
+    assert (
+        (timcol_home / "ledger-2023.dat")
+        .read_text()
+        .endswith("i 2023/07/30 10:01:12 AM Account1  Current task\n")
+    )
+    assert (timcol_home / "ledger-2022.dat").read_text().count("\n") == 2
+
+    main(["csv", "100"])
+    assert capsys.readouterr().out.splitlines() == [
+        "Date,Duration,Rate,Cost,Description",
+        "2022/12/30,1:00:00,$100.00,$100.00,Old task",
+        "2023/01/02,0:30:00,$100.00,$50.00,New task",
+        ",,,$150.00,TOTAL COST",
+    ]
+
+    with (timcol_home / "ledger-2022.dat").open("a") as f:
+        f.write("i 2022/12/31 09:00:00 AM Account1  Forgotten task\n")
+    for argv in [["stop"], ["csv", "100"]]:
+        with pytest.raises(SystemExit) as exit_info:
+            main(argv)
+        assert exit_info.value.code == 1
+        assert capsys.readouterr().out.startswith("Found pending task in ")
+
+    with pytest.raises(SystemExit):
+        main(["-f", str(timcol_home / "missing-*.dat"), "start", "A", "B"])
+    assert capsys.readouterr().out == (
+        f"No ledger matches {timcol_home / 'missing-*.dat'}\n"
+    )
+
+
+def test_register_watch(mock_time, capsys):
+    follower = follow.LedgerFollower(str(ledger_path))
+    watcher = register._Watcher(ParsedArgs.RegisterArgs(False, False, None, None))
+
+    def check() -> None:
+        main(["reg"])
+        expected = capsys.readouterr().out
+        rows = watcher.rows(follower.refresh())
+        assert f"{tabulate(rows, headers='keys')}\n" == expected
+        assert watcher.rows(follower.refresh(), 3) == rows[-3:]
+
+    main(["backfill", "Account1", "Task 1", "2023/07/29 09:00:00", "1h"])
+    check()
+    main(["start", "Account1", "Task 2"])
+    check()
+    mock_time.move_to(timedelta(minutes=30))
+    check()
+    with ledger_path.open("a") as f:
+        f.write("    ; Multiplier: 2\n")
+    check()
+    main(["swap", "Account2", "Task 3"])
+    check()
+    main(["cancel"])
+    capsys.readouterr()
+    check()
+    ledger_path.write_text("i 2023/07/30 08:00:00 AM Account3  Rewritten\n")
+    check()
+
+    # Editing an earlier line in place, without changing the ledger's size
+    main(["stop"])
+    main(["start", "Account1", "Task 4"])
+    check()
+    mock_time.move_to(timedelta(minutes=1))
+    ledger_path.write_text(ledger_path.read_text().replace("Account3", "Account4"))
+    check()
+
+    with mock.patch("time.sleep", side_effect=KeyboardInterrupt):
+        main(["reg", "--watch"])
+    out = capsys.readouterr().out
+    assert out.startswith(register.CLEAR_SCREEN)
+    assert "Rewritten" in out
+
+    # The terminal's height already limits what's shown
+    for window in [["--last", "1"], ["--days", "1"]]:
+        with pytest.raises(SystemExit):
+            main(["reg", "--watch", *window])
+        assert "not allowed with argument -w/--watch" in capsys.readouterr().err
+
+
+def test_register_last(mock_time, capsys):
+    ledger_path.write_text(
+        """i 2023/07/28 09:00:00 AM Account1  Task 1
+o 2023/07/28 10:00:00 AM
+i 2023/07/29 09:00:00 AM Account1  Task 2
+o 2023/07/29 10:00:00 AM
+i 2023/07/29 10:00:00 AM Account2  Task 3
+    ; Multiplier: 2
+o 2023/07/29 11:00:00 AM
+i 2023/07/30 09:00:00 AM Account1  Task 4
+o 2023/07/30 09:30:00 AM
+"""
+    )
+
+    main(["reg"])
+    full = capsys.readouterr().out.splitlines()
+
+    # Task 2 is only read to complete Jul 29's subtotal, it's not in the total
+    main(["reg", "--last", "2"])
+    assert capsys.readouterr().out.splitlines() == [
+        *full[:2],
+        "Jul 29 @ 10:00 AM  2:00:00 / 2.0  Account2   Task 3",
+        "Jul 29 SUBTOTAL    3:00:00",
+        "",
+        "Jul 30 @ 09:00 AM  0:30:00        Account1   Task 4",
+        "Jul 30 SUBTOTAL    0:30:00",
+        "TOTAL TIME         2:30:00",
+    ]
+
+    main(["reg", "--days", "2"])
+    assert capsys.readouterr().out.splitlines() == [
+        *full[:2],
+        *full[5:-1],
+        "TOTAL TIME         3:30:00",
+    ]
+
+    main(["reg", "--days", "1", "--account", "Account2"])
+    assert capsys.readouterr().out.splitlines() == [
+        "timestamp    duration",
+        "-----------  ----------",
+        "TOTAL TIME   0:00:00",
+    ]
+
+    main(["start", "Account2", "Task 5"])
+    main(["reg", "-n", "1", "--account", "Account1"])
+    assert capsys.readouterr().out.splitlines()[2:] == [
+        "Jul 30 @ 09:00 AM  0:30:00     Account1   Task 4",
+        "Jul 30 SUBTOTAL    0:30:00",
+        "TOTAL TIME         0:30:00",
+    ]
+
+
+def test_register_last_large_ledger(mock_time, capsys):
+    ledger_path.write_text(
+        "".join(
+            f"i 2023/07/29 09:00:00 AM Account{i % 5}  Task {i}\n"
+            "o 2023/07/29 10:00:00 AM\n"
+            for i in range(50_000)
+        )
+    )
+    main(["backfill", "Account1", "Last task", "2023/07/30 09:00:00", "1h"])
+
+    with _counting_reads() as opened:
+        main(["reg", "--last", "1"])
+
+    assert capsys.readouterr().out.splitlines()[2:] == [
+        "Jul 30 @ 09:00 AM  1:00:00     Account1   Last task",
+        "Jul 30 SUBTOTAL    1:00:00",
+        "TOTAL TIME         1:00:00",
+    ]
+    assert sum(i.bytes_read for i in opened) < 4 * 8192
+
+
+def test_profile(mock_time, capsys):
+    main(["backfill", "Account1", "Task 1", "2023/07/29 09:00:00", "1h"])
+    main(["backfill", "Account2", "Task 2", "2023/07/29 10:00:00", "1h"])
+    main(["start", "Account1", "Task 3"])
+    capsys.readouterr()
+
+    main(["--profile", "csv", "100"])
+    out, err = capsys.readouterr()
+    assert out.splitlines()[0] == "Date,Duration,Rate,Cost,Description"
+    phases = [i[:18].strip() for i in err.splitlines()[1:-3]]
+    assert phases == [
+        "parse args",
+        "read",
+        "parse directives",
+        "pair entries",
+        "render",
+        "other",
+    ], err
+    assert err.splitlines()[-1].startswith("5 lines, 3 entries, ")
+
+    with mock.patch.dict(os.environ, {"TIMCOL_PROFILE": "/timcol-home/csv.prof"}):
+        main(["csv", "100"])
+    out, err = capsys.readouterr()
+    assert "Saved cProfile stats to /timcol-home/csv.prof" in err
+    assert (timcol_home / "csv.prof").stat().st_size > 0
+
+    for value in ["0", "false", ""]:
+        with mock.patch.dict(os.environ, {"TIMCOL_PROFILE": value}):
+            main(["csv", "100"])
+        assert capsys.readouterr().err == ""
+    assert not Path("0").exists() and not Path("false").exists()
+
+    with mock.patch.dict(os.environ, {"TIMCOL_PROFILE": "true"}):
+        main(["csv", "100"])
+    err = capsys.readouterr().err
+    assert err.splitlines()[-1].startswith("5 lines, 3 entries, ")
+    assert "Saved cProfile stats" not in err
+
+
+def test_upload_skips_unchanged_ledger(mock_time, capsys):
+    main(["backfill", "Account1", "Task 1", "2023/07/29 09:00:00", "1h"])
+    uploaded_size = ledger_path.stat().st_size
+
+    runs = []
+
+    def run(path, check, env):
+        runs.append({k: env[k] for k in env if k.startswith(("TIMCOL_L", "TIMCOL_U"))})
+
+    with mock.patch("timcol.tool.upload.subprocess.run", run):
+        main(["upload"])
+        main(["sync"])
+        assert capsys.readouterr().out == (
+            "Ledger unchanged since the last upload, skipping (see --force)\n"
+        )
+
+        main(["start", "Account1", "Task 2"])
+        main(["upload"])
+        main(["upload", "--force"])
+
+        # Rewriting the ledger means it all needs to be uploaded again
+        ledger_path.write_text(ledger_path.read_text().replace("Task 1", "Task 0"))
+        main(["upload"])
+
+    size = ledger_path.stat().st_size
+    assert {i.pop("TIMCOL_LEDGER") for i in runs} == {str(ledger_path)}
+    assert runs == [
+        {
+            "TIMCOL_UPLOAD_OFFSET": "0",
+            "TIMCOL_UPLOAD_END": str(uploaded_size),
+            "TIMCOL_UPLOAD_CHANGED": str(ledger_path),
+        },
+        {
+            "TIMCOL_UPLOAD_OFFSET": str(uploaded_size),
+            "TIMCOL_UPLOAD_END": str(size),
+            "TIMCOL_UPLOAD_CHANGED": str(ledger_path),
+        },
+        {
+            "TIMCOL_UPLOAD_OFFSET": str(size),
+            "TIMCOL_UPLOAD_END": str(size),
+            "TIMCOL_UPLOAD_CHANGED": "",
+        },
+        {
+            "TIMCOL_UPLOAD_OFFSET": "0",
+            "TIMCOL_UPLOAD_END": str(size),
+            "TIMCOL_UPLOAD_CHANGED": str(ledger_path),
+        },
+    ]
+
+
+def test_json(mock_time, capsys, monkeypatch):
+    main(["backfill", "Account1", "Task 1", "2023/07/29 09:00:00", "1h"])
+    with ledger_path.open("a") as f:
+        f.write("    ; Multiplier: 2\n")
+    main(["backfill", "Account2", 'Task "2"', "2023/07/29 11:00:00", "30m"])
+    main(["start", "Account1", "Task 3"])
+    capsys.readouterr()
+
+    def epoch(text: str) -> int:
+        return int(datetime.strptime(text, "%Y/%m/%d %H:%M:%S").timestamp())
+
+    first = {
+        "start": epoch("2023/07/29 09:00:00"),
+        "end": epoch("2023/07/29 10:00:00"),
+        "seconds": 3600,
+        "account": "Account1",
+        "task": "Task 1",
+        "metadata": {"Multiplier": "2"},
+        "pending": False,
+    }
+    second = {
+        "start": epoch("2023/07/29 11:00:00"),
+        "end": epoch("2023/07/29 11:30:00"),
+        "seconds": 1800,
+        "account": "Account2",
+        "task": 'Task "2"',
+        "metadata": {},
+        "pending": False,
+    }
+    pending = {
+        "start": epoch("2023/07/30 10:01:12"),
+        "end": None,
+        "seconds": None,
+        "account": "Account1",
+        "task": "Task 3",
+        "metadata": {},
+        "pending": True,
+    }
+
+    main(["json"])
+    lines = capsys.readouterr().out.splitlines()
+    assert [json.loads(i) for i in lines] == [first, second, pending]
+
+    main(["json", "--account", "Account1", "--until", "2023/07/30"])
+    assert [json.loads(i) for i in capsys.readouterr().out.splitlines()] == [first]
+
+    # Records are written in chunks, so the array must be joined correctly
+    # across them
+    monkeypatch.setattr(json_view, "CHUNK_RECORDS", 1)
+    main(["json", "--array"])
+    assert json.loads(capsys.readouterr().out) == [first, second, pending]
+
+    main(["json", "--array", "--account", "Account3"])
+    assert capsys.readouterr().out == "[]\n"
+
+
+def test_invoices(mock_time, capsys, mock_fs):
+    mock_fs.add_real_directory(os.path.dirname(html.__file__))
+    main(["backfill", "Account1", "Task 1", "2023/06/29 09:00:00", "1h"])
+    main(["backfill", "Account1", "Task 2", "2023/07/29 09:00:00", "1h"])
+    main(["backfill", "Account/2", "Task 3", "2023/07/29 11:00:00", "30m"])
+    with ledger_path.open("a") as f:
+        f.write("    ; Rate: 300\n")
+    main(["start", "Account1", "Task 4"])
+    rates_path = timcol_home / "rates.toml"
+    rates_path.write_text('"Account/2" = 200\n')
+    capsys.readouterr()
+
+    main(["invoices", "100", "-o", "/out", "--rates", str(rates_path), "-j", "1"])
+    assert capsys.readouterr().out.splitlines() == [
+        "/out/Account_2/2023-07.html",
+        "/out/Account_2/2023-07.csv",
+        "/out/Account1/2023-06.html",
+        "/out/Account1/2023-06.csv",
+        "/out/Account1/2023-07.html",
+        "/out/Account1/2023-07.csv",
+    ]
+
+    # Each invoice matches the one for just its account and period
+    main(["csv", "100", "--since", "2023/07/01", "--account", "Account1"])
+    csv_invoice = Path("/out/Account1/2023-07.csv").read_bytes().decode()
+    assert csv_invoice == capsys.readouterr().out
+    main(["html", "200", "--account", "Account/2"])
+    assert Path("/out/Account_2/2023-07.html").read_text() == capsys.readouterr().out
+
+    main(
+        ["invoices", "100", "-o", "/out", "--allow-rate-override", "--period", "year"]
+        + ["--format", "csv", "--account", "Account/2", "-j", "1"]
+    )
+    assert capsys.readouterr().out == "/out/Account_2/2023.csv\n"
+    assert "$150.00" in Path("/out/Account_2/2023.csv").read_text()
+
+    # Accounts whose file names would collide each get their own
+    main(["cancel"])
+    main(["backfill", "Account 2", "Task 5", "2023/07/29 12:00:00", "1h"])
+    capsys.readouterr()
+    main(["invoices", "100", "-o", "/out", "--format", "csv", "--period", "year"])
+    *collided, account1 = capsys.readouterr().out.splitlines()
+    assert account1 == "/out/Account1/2023.csv"
+    assert len(set(collided)) == 2
+    assert all(i.startswith("/out/Account_2-") for i in collided)
+    assert ["Task 5" in Path(i).read_text() for i in collided] == [True, False]
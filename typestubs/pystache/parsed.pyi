@@ -17,6 +17,8 @@ class ParsedTemplate:
     string.
 
     """
+
+    _parse_tree: list
     def __init__(self) -> None: ...
     def __repr__(self):  # -> str:
         ...
@@ -9,7 +9,9 @@ Exposes a parse() function to parse template strings.
 END_OF_LINE_CHARACTERS = ...
 NON_BLANK_RE = ...
 
-def parse(template, delimiters=...):
+from pystache.parsed import ParsedTemplate
+
+def parse(template, delimiters=...) -> ParsedTemplate:
     """
     Parse a unicode template string and return a ParsedTemplate instance.
 
@@ -44,6 +46,7 @@ class _ChangeNode:
         ...
 
 class _EscapeNode:
+    key: str
     def __init__(self, key) -> None: ...
     def __repr__(self):  # -> str:
         ...
@@ -69,6 +72,8 @@ class _InvertedNode:
         ...
 
 class _SectionNode:
+    key: str
+    parsed: ParsedTemplate
     def __init__(
         self, key, parsed, delimiters, template, index_begin, index_end
     ) -> None: ...